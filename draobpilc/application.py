@@ -58,6 +58,7 @@ class Application(Gtk.Application):
         gtk_settings.props.gtk_application_prefer_dark_theme = True
 
         self._window = None
+        self._n_pending_deletes = 0
         self._editor = editor.Editor()
         self._previewer = previewer.Previewer()
         self._merger = merger.Merger()
@@ -127,6 +128,7 @@ class Application(Gtk.Application):
             lambda iv: self.selection_changed()
         )
         self._items_view.bind(self._history_items)
+        self._history_items.connect('changed', self._on_history_changed)
 
         gpaste_client.connect('ShowHistory', self.toggle)
         gpaste_client.connect('Tracking',
@@ -170,13 +172,21 @@ class Application(Gtk.Application):
             index=search_index
         )
 
+        if self._history_items.searching:
+            self._search_box.spinner.start()
+        else:
+            self._search_box.spinner.stop()
+
+    def _on_history_changed(self, history_items):
+        if not history_items.searching: self._search_box.spinner.stop()
+
     def _on_entry_activated(self, entry):
         items = self._items_view.get_selected()
         if items: self._on_item_activated(self._items_view, items[0])
         return True
 
     def _on_item_activated(self, items_view, history_item):
-        gpaste_client.select(history_item.uuid)
+        gpaste_client.select_async(history_item.uuid)
         self._search_box.entry.set_text('')
         self.hide()
 
@@ -185,7 +195,8 @@ class Application(Gtk.Application):
 
         self._items_processors.set_items(
             [item],
-            timeout=common.SETTINGS[common.SET_ITEMS_TIMEOUT]
+            timeout=common.SETTINGS[common.SET_ITEMS_TIMEOUT],
+            prefetch=self._items_view.get_neighbours(item)
         )
 
     def _on_delete_action(self, action, param):
@@ -290,32 +301,32 @@ class Application(Gtk.Application):
         )
 
     def delete_items(self, items, resume_selection=True):
-        delete_indexes = [(item.index, item.uuid) for item in items]
-        delete_indexes = sorted(delete_indexes)
+        if resume_selection: self._items_view.save_selection()
 
+        # the daemon sends an Update for every single delete, nothing to
+        # learn from them while the batch is on its way
+        self._n_pending_deletes += 1
         self._history_items.freeze(True)
-        if resume_selection: self._items_view.save_selection()
+        self._history_items.remove_items(items)
+        if resume_selection: self._items_view.resume_selection()
 
-        for i, index in enumerate(delete_indexes):
-            delete_index = index[0] - i
-            if delete_index < 0: continue
-            gpaste_client.delete(index[1])
+        futures = [gpaste_client.delete_async(item.uuid) for item in items]
 
-        filter_active = self._search_box.search_text or self._search_box.flags
-        self._history_items.freeze(False)
-        self._history_items.reload_history(emit_signal=not filter_active)
+        def on_deleted(future):
+            self._n_pending_deletes -= 1
+            if self._n_pending_deletes: return
 
-        if filter_active:
-            self._on_search_changed(self._search_box)
+            self._history_items.freeze(False)
+            self._history_items.update_history()
 
-        if resume_selection: self._items_view.resume_selection()
+        gpaste_client.when_all(futures).add_done_callback(on_deleted)
 
     def merge_items(self, merger, items, delete_merged):
         merged_text = self._merger.buffer.props.text
         if not merged_text: return
 
         if delete_merged: self.delete_items(items, resume_selection=False)
-        gpaste_client.add(merged_text)
+        gpaste_client.add_async(merged_text)
         self.hide()
 
     def do_command_line(self, command_line):
@@ -18,20 +18,68 @@
 import os
 
 import humanize
-from gi.repository import GdkPixbuf, Gio, GLib
+from gi.repository import Gio, GLib
 
 from draobpilc import common
 from draobpilc.history_item_kind import HistoryItemKind
-from draobpilc.lib import gpaste_client, utils
+from draobpilc.lib import thumbnails, utils
 from draobpilc.lib.signals import Emitter
 from draobpilc.widgets.history_item_view import HistoryItemView
 
+# metadata below is only looked up when somebody asks for it,
+# None is a valid result so it can't mark "not yet"
+_NOT_LOADED = object()
+
+
+def _collapse_whitespace(text, max_length):
+    """ ' '.join(text.split()) cut at max_length, only looks at as much
+    of text as it takes """
+    length = max_length
+
+    while True:
+        prefix = text[:length]
+        result = ' '.join(prefix.split())
+        if len(result) > max_length or len(prefix) == len(text): break
+        length *= 2
+
+    if len(result) > max_length:
+        result = result[:max_length].rstrip() + '\u2026'
+
+    return result
+
 
 class HistoryItem(Emitter):
+    """ data of a history entry, its view is only made when shown """
 
     FILTER_HIGHLIGHT_TPL = '<span bgcolor="yellow" fgcolor="black"><b>%s</b></span>'
-
-    def __init__(self, index, uuid):
+    # chars a label line can take, ItemsView raises it to fit its width.
+    # Labels show ITEM_MAX_LINES of them, the text is cut there before
+    # it's escaped or highlighted
+    line_length = 100
+
+    __slots__ = (
+        '_index',
+        '_uuid',
+        '_raw',
+        '_kind',
+        '_text',
+        '_display_text',
+        '_display_length',
+        '_markup',
+        '_sort_score',
+        '_match',
+        '_highlighted_match',
+        '_highlight_length',
+        '_n_lines',
+        '_links',
+        '_content_type',
+        '_thumb_path',
+        '_info_string',
+        '_widget',
+        '_app_info'
+    )
+
+    def __init__(self):
         super().__init__()
 
         self._index = None
@@ -39,71 +87,71 @@ class HistoryItem(Emitter):
         self._raw = None
         self._kind = None
         self._text = None
+        self._display_text = None
+        self._display_length = 0
         self._markup = None
-        self._source_markup = None
         self._sort_score = None
-        self._n_lines = None
-        self._link = None
-        self._content_type = None
-        self._thumb_path = None
-        self._info_string = None
+        self._match = None
+        self._highlighted_match = None
+        self._highlight_length = 0
         self._widget = None
-        self._app_info = None
+        self._reset_metadata()
 
         self.add_signal('changed')
 
-        if index >= 0: self.load_data(index, uuid)
-
     def __repr__(self):
         text = 'Data not loaded'
 
         try:
-            text = ' '.join(self.text.split())
-        except AttributeError:
+            text = _collapse_whitespace(self.text, 30)
+        except TypeError:
             pass
-        else:
-            text = text.strip()[:30]
 
         return '<HistoryItem: index=%i, "%s">' % (self.index, text)
 
-    def load_data(self, index, uuid):
-        emit_signal = False
-        if self.index: emit_signal = True
+    def load_element(self, index, element):
+        # the first item has index 0, whether it was loaded is the uuid
+        emit_signal = self._uuid is not None
 
         self.index = index
-        self._uuid = uuid
-        self._raw = gpaste_client.get_raw_element(self._uuid)
-        self._kind = gpaste_client.get_element_kind(self._uuid)
+        self._uuid = element.uuid
+        self._raw = element.raw
+        self._kind = element.kind
 
         if (self.kind == HistoryItemKind.TEXT and
             utils.is_url(self.raw)
         ):
             self._kind = HistoryItemKind.LINK
 
-        self._n_lines = len(self.raw.split('\n'))
-        self._links = self._get_links()
-        self._thumb_path = self._get_thumb_path()
-        self._app_info = self._get_app_info()
-        self._info_string = self._get_info()
+        self._reset_metadata()
+        self.text = element.text
+        if emit_signal: self.emit('changed')
 
-        if not self._widget: self._widget = HistoryItemView(self)
+    def _reset_metadata(self):
+        self._n_lines = _NOT_LOADED
+        self._links = _NOT_LOADED
+        self._content_type = _NOT_LOADED
+        self._thumb_path = _NOT_LOADED
+        self._info_string = _NOT_LOADED
+        self._app_info = _NOT_LOADED
 
-        self.text = gpaste_client.get_element(self._uuid)
-        if emit_signal: self.emit('changed')
+    def _load_file_info(self):
+        self._content_type = None
+        self._thumb_path = self._get_thumb_path()
 
     def _get_display_text(self, text, escape=True):
-        text = ' '.join(text.split())
-        text = text.strip()
-        if escape: text = GLib.markup_escape_text(text)
+        if escape:
+            text = _collapse_whitespace(text, self.get_display_length())
+            text = GLib.markup_escape_text(text)
+        else:
+            # markup can't be cut just anywhere
+            text = ' '.join(text.split())
 
         if self.kind == HistoryItemKind.FILE:
             text = text.replace('[Files]', '', 1)
         if self.kind == HistoryItemKind.IMAGE:
             text = text.replace('[Image]', '', 1)
 
-        if common.SETTINGS[common.SHOW_INDEXES]:
-            text = '<b>%i</b>. %s' % (self.index, text)
-
         return text
 
     def _get_thumb_path(self):
@@ -130,17 +178,8 @@ class HistoryItem(Emitter):
             if path:
                 result = path
             elif is_image:
-                try:
-                    GdkPixbuf.Pixbuf.new_from_file_at_scale(
-                        filename,
-                        80,
-                        80,
-                        False
-                    )
-                except GLib.Error:
-                    pass
-                else:
-                    result = filename
+                # ItemThumb decodes it on a thread when it's shown
+                if thumbnails.can_decode(filename): result = filename
             else:
                 pass
         except GLib.Error:
@@ -162,7 +201,7 @@ class HistoryItem(Emitter):
             app_info = Gio.AppInfo.get_default_for_uri_scheme(uri_scheme)
         else:
             app_info = Gio.AppInfo.get_default_for_type(
-                self._content_type,
+                self.content_type,
                 False
             )
 
@@ -202,14 +241,20 @@ class HistoryItem(Emitter):
             else:
                 result += humanize.naturalsize(size, gnu=True)
 
-                if self._content_type:
-                    result += ', Type: %s' % self._content_type
+                if self.content_type:
+                    result += ', Type: %s' % self.content_type
 
         return result
 
+    @classmethod
+    def new_from_element(cls, index, element):
+        item = cls()
+        item.load_element(index, element)
+        return item
+
     @classmethod
     def new_from_raw(cls, raw_content, kind=HistoryItemKind.TEXT):
-        item = cls(-1, '')
+        item = cls()
         item._index = -1
         item._raw = raw_content
         item._kind = kind
@@ -219,14 +264,6 @@ class HistoryItem(Emitter):
         ):
             item._kind = HistoryItemKind.LINK
 
-        item._n_lines = len(item.raw.split('\n'))
-        item._links = item._get_links()
-        item._thumb_path = item._get_thumb_path()
-        item._app_info = item._get_app_info()
-        item._info_string = item._get_info()
-
-        if not item._widget: item._widget = HistoryItemView(item)
-
         if item.kind == HistoryItemKind.FILE: text = '[Files] ' + raw_content
         else: text = raw_content
 
@@ -239,16 +276,14 @@ class HistoryItem(Emitter):
 
     @index.setter
     def index(self, value):
-        if not self._index is None: update_label = True
-        else: update_label = False
+        update_label = (
+            not self._index is None and
+            self._index != value and
+            common.SETTINGS[common.SHOW_INDEXES]
+        )
 
         self._index = value
-
-        if update_label:
-            if self._source_markup:
-                self.markup = self._source_markup
-            else:
-                self.markup = None
+        if update_label: self._update_label()
 
     @property
     def uuid(self):
@@ -269,9 +304,9 @@ class HistoryItem(Emitter):
     @text.setter
     def text(self, value):
         self._text = value
+        self._display_text = None
 
-        if not self.markup:
-            self.widget.set_label(self.display_text)
+        if not self.markup: self._update_label()
 
     @property
     def markup(self):
@@ -281,19 +316,59 @@ class HistoryItem(Emitter):
     def markup(self, value):
         if not value:
             self._markup = None
-            self._source_markup = None
-            self.widget.set_label(self.display_text)
         else:
-            self._source_markup = value
             self._markup = self._get_display_text(value, False)
-            self.widget.set_label(self.markup)
+
+        self._update_label()
+
+    def _update_label(self):
+        if self._widget is None: return
+        self._widget.set_label(self.label)
+
+    @classmethod
+    def get_display_length(cls):
+        """ how much of the text a label can show """
+        return cls.line_length * common.SETTINGS[common.ITEM_MAX_LINES]
 
     @property
     def display_text(self):
-        return self._get_display_text(self._text)
+        """ escaped label text, made once per text and display length """
+        display_length = self.get_display_length()
+
+        if (
+            self._display_text is None or
+            self._display_length < display_length
+        ):
+            self._display_text = self._get_display_text(self._text)
+            self._display_length = display_length
+
+        return self._display_text
+
+    @property
+    def label(self):
+        if (
+            self._highlighted_match and
+            self._highlight_length < self.get_display_length()
+        ):
+            self._markup = self._get_display_text(
+                self._get_highlighted(),
+                False
+            )
+
+        text = self._markup or self.display_text
+
+        if common.SETTINGS[common.SHOW_INDEXES]:
+            text = '<b>%i</b>. %s' % (self.index, text)
+
+        return text
+
+    @property
+    def has_widget(self):
+        return self._widget is not None
 
     @property
     def widget(self):
+        if self._widget is None: self._widget = HistoryItemView(self)
         return self._widget
 
     @property
@@ -303,27 +378,77 @@ class HistoryItem(Emitter):
     @sort_score.setter
     def sort_score(self, value):
         self._sort_score = value
+
+    @property
+    def match(self):
+        return self._match
+
+    @match.setter
+    def match(self, value):
+        """ only keeps the fuzzy.Result, see highlight() for the markup """
+        self._match = value
+        self._sort_score = value.score if value else None
+
+    def highlight(self):
+        """ markup from the current match, done only for shown items """
+        if self._highlighted_match is self._match: return
+        if not self._match: return self.clear_highlight()
+
+        self._highlighted_match = self._match
+        self.markup = self._get_highlighted()
+
+    def _get_highlighted(self):
+        self._highlight_length = self.get_display_length()
+
+        return self._highlighted_match.get_highlighted(
+            escape_func=GLib.markup_escape_text,
+            highlight_template=self.FILTER_HIGHLIGHT_TPL,
+            max_length=self._highlight_length
+        )
+
+    def clear_highlight(self):
+        if self._highlighted_match is None: return
+
+        self._highlighted_match = None
+        self.markup = None
     
     @property
     def thumb_path(self):
+        if self._thumb_path is _NOT_LOADED: self._load_file_info()
         return self._thumb_path
     
     @property
     def links(self):
+        if self._links is _NOT_LOADED: self._links = self._get_links()
         return self._links
 
     @property
     def n_lines(self):
+        if self._n_lines is _NOT_LOADED:
+            self._n_lines = self._raw.count('\n') + 1
+
         return self._n_lines
 
     @property
     def info_string(self):
+        if self._info_string is _NOT_LOADED:
+            self._info_string = self._get_info()
+
         return self._info_string
     
+    @property
+    def file_info_loaded(self):
+        """ whether thumb_path and content_type are known without I/O """
+        return self._thumb_path is not _NOT_LOADED
+
     @property
     def content_type(self):
+        if self._content_type is _NOT_LOADED: self._load_file_info()
         return self._content_type
 
     @property
     def app_info(self):
+        if self._app_info is _NOT_LOADED:
+            self._app_info = self._get_app_info()
+
         return self._app_info
@@ -15,11 +15,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from gi.repository import GLib
+from concurrent.futures import Future
 
 from draobpilc import common
 from draobpilc.history_item import HistoryItem
-from draobpilc.lib import fuzzy, gpaste_client
+from draobpilc.lib import gpaste_client, history_diff
+from draobpilc.lib.char_index import CharIndex
+from draobpilc.lib.search_worker import SearchWorker
 from draobpilc.lib.signals import Emitter
 
 
@@ -29,11 +31,26 @@ class HistoryItems(Emitter):
         super().__init__()
 
         self._items = []
+        self._by_uuid = {}
+        self._by_index = {}
+        self._char_index = CharIndex()
+        self._search_worker = SearchWorker()
+        self._items_version = 0
         self._filter_result = []
+        self._filter_items = []
         self._filter_mode = False
+        self._filter_args = None
+        self._candidates = None
+        self._candidates_term = None
+        self._candidates_key = None
         self._raw_history = []
+        self._positions = {}
+        self._reload_serial = 0
 
         self.add_signal('removed')
+        self.add_signal('inserted')
+        self.add_signal('moved')
+        self.add_signal('updated')
         self.add_signal('changed')
 
         self._signal_match = gpaste_client.connect('Update', self._on_update)
@@ -41,10 +58,7 @@ class HistoryItems(Emitter):
 
     def __len__(self):
         if self._filter_mode:
-            result = min(
-                len(self._filter_result),
-                common.SETTINGS[common.MAX_FILTER_RESULTS]
-            )
+            result = len(self._filter_items)
         else:
             result = len(self._items)
 
@@ -57,99 +71,291 @@ class HistoryItems(Emitter):
         return self.items[key]
 
     def _on_update(self, action, target, position):
-        self._raw_history = gpaste_client.get_raw_history()
+        if (
+            action == gpaste_client.Action.REPLACE and
+            target == gpaste_client.Target.ALL
+        ):
+            self.update_history()
+            return
 
-        if action == gpaste_client.Action.REPLACE:
-            if target == gpaste_client.Target.ALL:
-                self.reload_history()
-            elif target == gpaste_client.Target.POSITION:
-                self.reload_item(position)
+        def on_raw_history(future):
+            if future.exception(): return
+            self._set_raw_history(future.result())
+
+            if action == gpaste_client.Action.REPLACE:
+                if target == gpaste_client.Target.POSITION:
+                    self.reload_item(position)
+            elif action == gpaste_client.Action.REMOVE:
+                if target == gpaste_client.Target.ALL:
+                    self.clear()
+                elif target == gpaste_client.Target.POSITION:
+                    self.remove(position)
             else:
                 pass
-        elif action == gpaste_client.Action.REMOVE:
-            if target == gpaste_client.Target.ALL:
-                self.clear()
-            elif target == gpaste_client.Target.POSITION:
-                self.remove(position)
-        else:
-            pass
+
+        future = gpaste_client.get_raw_history_async()
+        future.add_done_callback(on_raw_history)
 
     def _get_by_uuid(self, uuid):
-        result = None
+        return self._by_uuid.get(uuid)
+
+    def _set_raw_history(self, raw_history):
+        self._raw_history = raw_history
+        self._positions = {
+            raw[0]: index for index, raw in enumerate(raw_history)
+        }
+
+    def _set_items(self, items):
+        self._items = items
+        self._reindex()
+
+    def _reindex(self):
+        self._by_uuid = {item.uuid: item for item in self._items}
+        self._by_index = {item.index: item for item in self._items}
+        self._char_index.retain(self._by_uuid)
+        self._search_worker.retain(self._by_uuid)
+        self._invalidate_candidates()
 
         for item in self._items:
-            if item.uuid != uuid: continue
-            result = item
-            break
+            if item.uuid not in self._char_index: self._index_item(item)
 
-        return result
+    def _index_item(self, item):
+        self._char_index.add(item.uuid, item.text)
+        self._search_worker.add(item.uuid, item.text)
+
+    def _invalidate_candidates(self):
+        self._items_version += 1
+        self._candidates = None
+        self._candidates_term = None
+        self._candidates_key = None
 
     def _sync_index(self):
         for item in self._items:
-            try:
-                gpaste_index = self._raw_history.index((item.uuid, item.raw))
-            except ValueError:
-                pass
-            else:
-                if gpaste_index != item.index:
-                    item.index = gpaste_index
+            gpaste_index = self._positions.get(item.uuid)
+            if gpaste_index is None: continue
+            if self._raw_history[gpaste_index][1] != item.raw: continue
 
-    def get(self, index):
-        result = None
+            if gpaste_index != item.index:
+                item.index = gpaste_index
 
-        for item in self.items:
-            if item.index != index: continue
+        self._reindex()
 
-            result = item
-            break
+    def _add_elements(self, elements, emit_signal=True):
+        for element in elements:
+            if element.uuid in self._by_uuid: continue
 
-        return result
+            index = self._positions.get(element.uuid)
+            if index is None: continue
+
+            new_item = HistoryItem.new_from_element(index, element)
+            self._items.append(new_item)
+            self._by_uuid[new_item.uuid] = new_item
+            self._by_index[new_item.index] = new_item
+            self._index_item(new_item)
+
+        self._invalidate_candidates()
+        self._items.sort(key=lambda e: e.index)
+        if emit_signal: self.emit('changed')
+
+    def _apply_diff(self, changes, elements, raw_history):
+        self._set_raw_history(raw_history)
+        elements = {element.uuid: element for element in elements}
+        removed = set(changes.removed)
+        removed_items = [i for i in self._items if i.uuid in removed]
+        new_items = []
+
+        self._items = [i for i in self._items if i.uuid not in removed]
+
+        for uuid in changes.replaced:
+            element = elements.get(uuid)
+            if not element: continue
+
+            item = self._by_uuid[uuid]
+            item.load_element(self._positions[uuid], element)
+            self._index_item(item)
+
+        for uuid in changes.inserted:
+            element = elements.get(uuid)
+            if not element: continue
+
+            new_item = HistoryItem.new_from_element(
+                self._positions[uuid],
+                element
+            )
+            self._items.append(new_item)
+            new_items.append(new_item)
+
+        self._sync_index()
+        self._items.sort(key=lambda e: e.index)
+
+        if self._filter_args:
+            self._drop_filtered(removed_items)
+            for item in removed_items: self.emit('removed', item=item)
+            self.emit('updated')
+            self._refilter()
+            return
+
+        moved_items = [self._by_uuid[uuid] for uuid in changes.moved]
+        placed = [(item, 'inserted') for item in new_items]
+        placed += [(item, 'moved') for item in moved_items]
+        placed.sort(key=lambda p: p[0].index)
+
+        for item in removed_items: self.emit('removed', item=item)
+        for item, signal in placed: self.emit(signal, item=item)
+        self.emit('updated')
+
+    def _refilter(self):
+        term, kinds, index = self._filter_args
+        self.filter(term, kinds, index)
+
+    def get(self, index):
+        return self._by_index.get(index)
 
     def reload_item(self, index):
         item = self.get(index)
         if not item: return False
 
-        item.load_data(index)
+        def on_elements(future):
+            elements = future.result()
+            if not elements: return
+
+            item.load_element(index, elements[0])
+            self._index_item(item)
+            self._invalidate_candidates()
+
+        gpaste_client.get_elements([item.uuid]).add_done_callback(on_elements)
         return True
 
     def remove(self, index):
         item = self.get(index)
         if not item: return False
 
-        self.items.remove(item)
+        self._items.remove(item)
         self._sync_index()
+        if self._filter_args: self._drop_filtered([item])
+
         self.emit('removed', item=item)
-        self.emit('changed')
+        self.emit('updated')
+        if self._filter_args: self._refilter()
+
+    def remove_items(self, items):
+        """ drop items locally ahead of the daemon deleting them
+
+        The raw history is updated the way the daemon will update it, so
+        the other items get their new indexes right away and the next
+        update_history() only has to fix up the deletes that failed.
+        """
+        uuids = set(item.uuid for item in items)
+        removed_items = [i for i in self._items if i.uuid in uuids]
+        if not removed_items: return []
+
+        self._set_raw_history(
+            [raw for raw in self._raw_history if raw[0] not in uuids]
+        )
+        self._items = [i for i in self._items if i.uuid not in uuids]
+        self._sync_index()
+        # the refilter is async, the rows go now
+        if self._filter_args: self._drop_filtered(removed_items)
+
+        for item in removed_items: self.emit('removed', item=item)
+        self.emit('updated')
+        if self._filter_args: self._refilter()
+
+        return removed_items
 
     def reload_history(self, emit_signal=True):
+        """ returns a Future resolved once the items are up to date """
+        result = Future()
+        self._reload_serial += 1
+        serial = self._reload_serial
         self.reset_filter(emit_signal=False)
-        self._raw_history = gpaste_client.get_raw_history()
 
-        if len(self._raw_history) == 0:
-            self.clear()
-            return None
+        def on_elements(future):
+            if serial == self._reload_serial:
+                self._add_elements(future.result(), emit_signal)
 
-        new_list = []
-        new_items = []
+            result.set_result(None)
 
-        for index, raw in enumerate(self._raw_history):
-            uuid = raw[0]
-            old_item = self._get_by_uuid(uuid)
+        def on_raw_history(future):
+            if serial != self._reload_serial or future.exception():
+                result.set_result(None)
+                return
 
-            if old_item:
-                new_list.append(old_item)
-            else: 
-                new_item = HistoryItem(index, uuid)
-                new_items.append(new_item)
+            self._set_raw_history(future.result())
 
-        new_list.extend(new_items)
-        self._sync_index()
-        self._items = sorted(new_list, key=lambda e: e.index)
-        if emit_signal: self.emit('changed')
+            if len(self._raw_history) == 0:
+                self.clear()
+                result.set_result(None)
+                return
+
+            old_list = []
+            new_uuids = []
+
+            for index, raw in enumerate(self._raw_history):
+                uuid = raw[0]
+                old_item = self._get_by_uuid(uuid)
+
+                if old_item:
+                    old_list.append(old_item)
+                else:
+                    new_uuids.append(uuid)
+
+            self._set_items(old_list)
+            self._sync_index()
+
+            future = gpaste_client.get_elements(new_uuids)
+            future.add_done_callback(on_elements)
+
+        future = gpaste_client.get_raw_history_async()
+        future.add_done_callback(on_raw_history)
+        return result
+
+    def update_history(self):
+        """ apply only what changed in the daemon history
+
+        Emits removed/inserted/moved for the affected items followed by
+        updated, or re-runs the active filter. Returns a Future.
+        """
+        result = Future()
+        self._reload_serial += 1
+        serial = self._reload_serial
+
+        def on_elements(future, changes, raw_history):
+            if serial == self._reload_serial:
+                self._apply_diff(changes, future.result(), raw_history)
+
+            result.set_result(None)
+
+        def on_raw_history(future):
+            if serial != self._reload_serial or future.exception():
+                result.set_result(None)
+                return
+
+            raw_history = future.result()
+            changes = history_diff.diff(
+                [(item.uuid, item.raw) for item in self._items],
+                raw_history
+            )
+
+            if not changes:
+                self._set_raw_history(raw_history)
+                result.set_result(None)
+                return
+
+            future = gpaste_client.get_elements(
+                changes.inserted + changes.replaced
+            )
+            future.add_done_callback(
+                lambda f: on_elements(f, changes, raw_history)
+            )
+
+        future = gpaste_client.get_raw_history_async()
+        future.add_done_callback(on_raw_history)
+        return result
 
     def clear(self):
-        self._raw_history.clear()
-        self._items.clear()
+        self._set_raw_history([])
+        self._set_items([])
         self.reset_filter(emit_signal=False)
         self.emit('changed')
 
@@ -165,60 +371,140 @@ class HistoryItems(Emitter):
                 self._on_update
             )
 
+    def _on_matches(
+        self,
+        matches,
+        candidates,
+        term,
+        candidates_key,
+        items_version
+    ):
+        for filtered in self._filter_result: filtered.match = None
+        self._filter_result = []
+
+        # the worker already keeps only the best ones, in order
+        for uuid, match in matches:
+            item = self._by_uuid.get(uuid)
+            if not item: continue
+
+            item.match = match
+            self._filter_result.append(item)
+
+        if items_version == self._items_version:
+            self._candidates = [self._by_uuid[uuid] for uuid in candidates]
+            self._candidates_term = term
+            self._candidates_key = candidates_key
+
+        self._show_filter_result()
+
+    def _show_filter_result(self):
+        shown = set(self._filter_items)
+        self._filter_mode = True
+        self._filter_items = self._filter_result[
+            :common.SETTINGS[common.MAX_FILTER_RESULTS]
+        ]
+
+        # markup is only made for the shown items and dropped from
+        # the ones that left, the rest never had any
+        for item in shown.difference(self._filter_items):
+            item.clear_highlight()
+        for item in self._filter_items: item.highlight()
+        self.emit('changed')
+
+    def _drop_filtered(self, items):
+        """ takes removed items out of the current filter result """
+        items = set(items)
+
+        for item in items:
+            item.match = None
+            item.clear_highlight()
+
+        self._filter_result = [
+            i for i in self._filter_result if i not in items
+        ]
+        self._filter_items = [
+            i for i in self._filter_items if i not in items
+        ]
+
+    def _clear_filter_result(self):
+        for filtered in self._filter_result: filtered.match = None
+        for filtered in self._filter_items: filtered.clear_highlight()
+
+        self._filter_result.clear()
+        self._filter_items = []
+
     def filter(self, term='', kinds=None, index=None):
+        """ matching runs on the search worker, 'changed' is emitted when
+        the results are in, until then the previous results stay shown """
         if not any([term, kinds, index]):
             self.reset_filter(emit_signal=True)
             return
-        else:
-            self.reset_filter(emit_signal=False)
 
-        self._filter_mode = True
+        self._filter_args = (term, kinds, index)
 
-        for item in self._items:
-            if index and item.index == index:
-                self._filter_result.append(item)
-                break
+        if index:
+            self._search_worker.cancel()
+            self._clear_filter_result()
+            item = self.get(index)
+            if item: self._filter_result.append(item)
+            self._show_filter_result()
+            return
 
+        max_distance = common.SETTINGS[common.FUZZY_SEARCH_MAX_DISTANCE]
+        candidates_key = (tuple(kinds or ()), max_distance)
+        candidates = self._items
+        allowed = self._char_index.lookup(term)
+        snapshot = []
+
+        # whatever matches the extended term matched its prefix too,
+        # so only the previous matches (and whatever the worker didn't
+        # get to) have to be checked again
+        if (
+            self._candidates is not None and
+            self._candidates_key == candidates_key and
+            term.startswith(self._candidates_term)
+        ):
+            candidates = self._candidates
+
+        for item in candidates:
             if kinds and item.kind not in kinds: continue
-
-            match = fuzzy.match(
+            if allowed is not None and item.uuid not in allowed: continue
+            snapshot.append((item.uuid, item.text))
+
+        items_version = self._items_version
+        self._search_worker.search(
+            snapshot,
+            term,
+            max_distance,
+            common.SETTINGS[common.MAX_FILTER_RESULTS],
+            lambda matches, candidates: self._on_matches(
+                matches,
+                candidates,
                 term,
-                item.text,
-                common.SETTINGS[common.FUZZY_SEARCH_MAX_DISTANCE]
+                candidates_key,
+                items_version
             )
-
-            if match:
-                item.markup = match.get_highlighted(
-                    escape_func=GLib.markup_escape_text,
-                    highlight_template=HistoryItem.FILTER_HIGHLIGHT_TPL
-                )
-                item.sort_score = match.score
-                self._filter_result.append(item)
-            else:
-                item.markup = None
-                item.sort_score = None
-
-        self._filter_result.sort(key=lambda e: e.sort_score)
-        self.emit('changed')
+        )
 
     def reset_filter(self, emit_signal=True):
+        self._search_worker.cancel()
+        self._filter_args = None
         if not self._filter_mode: return
 
-        for filtered in self._filter_result:
-            filtered.markup = None
-            filtered.sort_score = None
-
-        self._filter_result.clear()
+        self._clear_filter_result()
         self._filter_mode = False
         if emit_signal: self.emit('changed')
 
+    @property
+    def searching(self):
+        return self._search_worker.busy
+
     @property
     def items(self):
+        # both lists are kept sorted when they change, so no sorting here
         if self._filter_mode:
-            self._filter_result.sort(key=lambda e: e.sort_score)
-            return self._filter_result[:common.SETTINGS[common.MAX_FILTER_RESULTS]]
+            return self._filter_items
         else:
-            self._items.sort(key=lambda e: e.index)
             return self._items
     
     @property
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+# Copyright 2016 Ivan awamper@gmail.com
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# texts at least this long also remember where each char occurs first
+# and last, enough to reject terms whose chars can't come in order
+ORDER_CHECK_MIN_LENGTH = 4096
+
+# pairs re.IGNORECASE treats as equal but upper().lower() doesn't
+_FOLD_FIXES = {
+    '\u0130': 'i',
+    '\u1fd3': '\u0390',
+    '\u1fe3': '\u03b0',
+    '\ufb05': '\ufb06'
+}
+
+
+def _fold(char):
+    result = _FOLD_FIXES.get(char)
+    if result: return result
+
+    for result in (char.upper().lower(), char.lower()):
+        if len(result) == 1: return result
+
+    return char
+
+
+def _get_keys(char):
+    keys = (char, char.lower(), _fold(char))
+    return set(key for key in keys if len(key) == 1)
+
+
+class CharIndex():
+    """ char -> bitset of texts containing it, for fuzzy.match() pruning
+
+    Every indexed text gets a bit, lookup() ANDs the bitsets of the term
+    chars so only texts containing all of them are left for the regex.
+    """
+
+    def __init__(self):
+        self._slots = {}
+        self._keys = {}
+        self._chars = {}
+        self._positions = {}
+        self._free_slots = []
+        self._next_slot = 0
+        self._all = 0
+        self._bitsets = {}
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def _get_positions(self, text, chars):
+        result = {}
+
+        for char in chars:
+            first = text.find(char)
+            last = text.rfind(char)
+
+            for key in _get_keys(char):
+                old_first, old_last = result.get(key, (first, last))
+                result[key] = (min(first, old_first), max(last, old_last))
+
+        return result
+
+    def add(self, key, text):
+        if key in self._slots: self.remove(key)
+
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = self._next_slot
+            self._next_slot += 1
+
+        bit = 1 << slot
+        text_chars = set(text)
+        chars = set()
+        for char in text_chars: chars.update(_get_keys(char))
+
+        for char in chars:
+            self._bitsets[char] = self._bitsets.get(char, 0) | bit
+
+        self._slots[key] = slot
+        self._keys[slot] = key
+        self._chars[slot] = ''.join(chars)
+        self._all |= bit
+
+        if len(text) >= ORDER_CHECK_MIN_LENGTH:
+            self._positions[slot] = self._get_positions(text, text_chars)
+
+    def remove(self, key):
+        slot = self._slots.pop(key, None)
+        if slot is None: return
+
+        mask = ~(1 << slot)
+
+        for char in self._chars.pop(slot):
+            bitset = self._bitsets[char] & mask
+            if bitset: self._bitsets[char] = bitset
+            else: del self._bitsets[char]
+
+        del self._keys[slot]
+        self._positions.pop(slot, None)
+        self._all &= mask
+        self._free_slots.append(slot)
+
+    def retain(self, keys):
+        keys = set(keys)
+
+        for key in list(self._slots):
+            if key not in keys: self.remove(key)
+
+    def clear(self):
+        self.__init__()
+
+    def lookup(self, term):
+        """ returns the set of keys that can match term, None if any can """
+        if not term: return None
+
+        term_keys = [_fold(char) for char in term]
+        bits = self._all
+
+        for char in set(term_keys):
+            bits &= self._bitsets.get(char, 0)
+            if not bits: break
+
+        result = set()
+        # lowest slot first, str.find() is way faster than bit twiddling
+        digits = bin(bits)[:1:-1]
+        slot = digits.find('1')
+
+        while slot != -1:
+            positions = self._positions.get(slot)
+
+            if not positions or self._in_order(term_keys, positions):
+                result.add(self._keys[slot])
+
+            slot = digits.find('1', slot + 1)
+
+        return result
+
+    def _in_order(self, term_keys, positions):
+        position = -1
+
+        for char in term_keys:
+            first, last = positions[char]
+            position = max(position + 1, first)
+            if position > last: return False
+
+        return True
@@ -15,8 +15,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import functools
 import re
 
+MATCHERS_CACHE_SIZE = 32
+
 
 class Result():
 
@@ -26,63 +29,101 @@ class Result():
         self.score = score
         self.start = start
         self.end = end
+        self._positions = None
+
+    @property
+    def positions(self):
+        """ (offset, highlighted) for the term chars inside the match,
+        computed once per match. Chars that aren't highlighted are left
+        out of the highlighted string """
+        if self._positions is not None: return self._positions
+
+        self._positions = []
+        search_term = self.term.lower()
+        next_term_char = None
+
+        for i in range(self.start, self.end):
+            char = self.original[i]
+            if not char.lower() in search_term: continue
+
+            if next_term_char and char != next_term_char:
+                self._positions.append((i, False))
+                continue
+
+            try:
+                index = search_term.index(char.lower())
+                next_term_char = search_term[index + 1]
+            except (IndexError, ValueError):
+                next_term_char = None
+
+            search_term = search_term.replace(char, '', 1)
+            self._positions.append((i, True))
+
+        return self._positions
 
     def get_highlighted(
         self,
         escape_func=None,
         max_precede_chars=30,
-        highlight_template='%s'
+        highlight_template='%s',
+        max_length=None
     ):
-        matched_string = self.original[self.start : self.end]
+        """ original around the match with the term chars highlighted,
+        cut after max_length chars of original unless the match is longer """
+        if not escape_func: escape_func = lambda text: text
         new_string = ''
+        previous = self.start
+        start_index = 0
 
         if self.start > 0:
             start_index = max(0, self.start - max_precede_chars)
-            temp_string = self.original[start_index : self.start]
-            if escape_func: temp_string = escape_func(temp_string)
-
             new_string += '...'
-            new_string += temp_string
+            new_string += escape_func(self.original[start_index : self.start])
 
-        search_term = self.term.lower()
-        next_term_char = None
+        end_index = len(self.original)
+        if max_length: end_index = max(self.end, start_index + max_length)
 
-        for char in matched_string:
-            if not char.lower() in search_term:
-                if escape_func: char = escape_func(char)
-                new_string += char
-            else:
-                if next_term_char and char != next_term_char:
-                    continue
+        for position, highlighted in self.positions:
+            new_string += escape_func(self.original[previous : position])
+            previous = position + 1
+            if not highlighted: continue
 
-                try:
-                    index = search_term.index(char.lower())
-                    next_term_char = search_term[index + 1]
-                except (IndexError, ValueError):
-                    next_term_char = None
-
-                search_term = search_term.replace(char, '', 1)
-                if escape_func: char = escape_func(char)
-                new_string += highlight_template % (char)
-
-        other_text = self.original[self.end:]
-        if escape_func: other_text = escape_func(other_text) 
-        new_string += other_text
+            new_string += highlight_template % (
+                escape_func(self.original[position])
+            )
 
+        new_string += escape_func(self.original[previous:end_index])
+        if end_index < len(self.original): new_string += '...'
         return new_string
-    
+
 
 # based on https://github.com/amjith/fuzzyfinder
+class Matcher():
+
+    def __init__(self, term, max_distance=30):
+        self.term = str(term)
+        self.max_distance = max_distance
+
+        pattern = '.{0,%i}' % max_distance
+        pattern = pattern.join(map(re.escape, self.term))
+        self._regex = re.compile(pattern, re.I)
+
+    def match(self, text):
+        result = None
+        match = self._regex.search(text)
+
+        if match:
+            score = len(match.group()) + match.start()
+            result = Result(self.term, text, score, match.start(), match.end())
+
+        return result
+
+
+@functools.lru_cache(maxsize=MATCHERS_CACHE_SIZE)
+def get_matcher(term, max_distance=30):
+    """ compiled Matcher for the term, recent ones are reused """
+    return Matcher(term, max_distance)
+
+
 def match(term, text, max_distance=30):
-    result = None
-    term = str(term)
-    pattern = '.{0,%i}' % max_distance
-    pattern = pattern.join(map(re.escape, term))
-    regex = re.compile(pattern, re.I)
-    match = regex.search(text)
-
-    if match:
-        score = len(match.group()) + match.start()
-        result = Result(term, text, score, match.start(), score)
-
-    return result
+    return get_matcher(str(term), max_distance).match(text)
@@ -15,6 +15,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
+from concurrent.futures import Future
+
 import dbus
 import dbus.mainloop.glib
 from gi.repository import Gio
@@ -33,6 +36,9 @@ class Target():
     POSITION = 'POSITION'
 
 
+Element = collections.namedtuple('Element', ['uuid', 'raw', 'kind', 'text'])
+
+
 SCHEMA_ID = common.SETTINGS[common.GPASTE_SCHEMA_ID]
 try:
     SETTINGS = utils.get_settings(SCHEMA_ID)
@@ -52,6 +58,47 @@ _client = dbus.Interface(
 )
 
 
+def call_async(method, *args):
+    """ call the GPaste method without blocking, returns a Future
+
+    The future is resolved from the main loop once the reply arrives, so
+    done callbacks run on the main thread. Never call result() on it
+    before it's done, that would deadlock the main loop.
+    """
+    future = Future()
+    future.set_running_or_notify_cancel()
+
+    def on_reply(*values):
+        if not values: future.set_result(None)
+        elif len(values) == 1: future.set_result(values[0])
+        else: future.set_result(values)
+
+    getattr(_client, method)(
+        *args,
+        reply_handler=on_reply,
+        error_handler=future.set_exception
+    )
+
+    return future
+
+
+def when_all(futures):
+    """ returns a Future resolved with the futures list when all are done """
+    futures = list(futures)
+    result = Future()
+    pending = len(futures)
+
+    def on_done(future):
+        nonlocal pending
+        pending -= 1
+        if pending == 0: result.set_result(futures)
+
+    if not futures: result.set_result(futures)
+    for future in futures: future.add_done_callback(on_done)
+
+    return result
+
+
 def get_prop(property_name):
 	return _gpaste_object.Get(
         common.SETTINGS[common.GPASTE_DBUS_IFACE],
@@ -92,6 +139,53 @@ def get_raw_element(uuid):
     return _client.GetRawElement(uuid)
 
 
+def get_elements(uuids):
+    """ fetch Element(uuid, raw, kind, text) for every uuid
+
+    All requests are sent at once without waiting for the replies, the
+    returned future resolves to the list of elements in uuids order after
+    the last reply arrived. Uuids that vanished from the history in the
+    meantime are skipped.
+    """
+    uuids = list(uuids)
+    methods = ['GetRawElement', 'GetElementKind', 'GetElement']
+    futures = [call_async(m, uuid) for uuid in uuids for m in methods]
+    result = Future()
+
+    def on_done(future):
+        elements = []
+
+        for i, uuid in enumerate(uuids):
+            replies = futures[i * len(methods) : (i + 1) * len(methods)]
+            if any(reply.exception() for reply in replies): continue
+
+            values = [str(reply.result()) for reply in replies]
+            elements.append(Element(uuid, *values))
+
+        result.set_result(elements)
+
+    when_all(futures).add_done_callback(on_done)
+    return result
+
+
+def get_elements_range(start, end):
+    """ same as get_elements() for the history slice [start:end] """
+    result = Future()
+
+    def on_raw_history(future):
+        if future.exception():
+            result.set_exception(future.exception())
+            return
+
+        uuids = [raw[0] for raw in future.result()[start:end]]
+        get_elements(uuids).add_done_callback(
+            lambda f: result.set_result(f.result())
+        )
+
+    get_raw_history_async().add_done_callback(on_raw_history)
+    return result
+
+
 def select(uuid):
     return _client.Select(uuid)
 
@@ -143,3 +237,54 @@ def reexecute():
 
 def backup_history(history_name, backup_name):
     return _client.BackupHistory(history_name, backup_name)
+
+
+def add_async(text):
+    return call_async('Add', text)
+
+
+def get_raw_history_async():
+    return call_async('GetRawHistory')
+
+
+def get_element_async(uuid):
+    return call_async('GetElement', uuid)
+
+
+def get_raw_element_async(uuid):
+    return call_async('GetRawElement', uuid)
+
+
+def get_element_kind_async(uuid):
+    return call_async('GetElementKind', uuid)
+
+
+def select_async(uuid):
+    return call_async('Select', uuid)
+
+
+def replace_async(uuid, contents):
+    return call_async('Replace', uuid, contents)
+
+
+def delete_async(uuid):
+    return call_async('Delete', uuid)
+
+
+def list_histories_async():
+    result = Future()
+
+    def on_done(future):
+        if future.exception(): result.set_exception(future.exception())
+        else: result.set_result(sorted(future.result()))
+
+    call_async('ListHistories').add_done_callback(on_done)
+    return result
+
+
+def get_history_size_async(name):
+    return call_async('GetHistorySize', name)
+
+
+def get_history_name_async():
+    return call_async('GetHistoryName')
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+# Copyright 2016 Ivan awamper@gmail.com
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import bisect
+
+
+class HistoryDiff():
+
+    def __init__(self):
+        self.removed = []
+        self.inserted = []
+        self.moved = []
+        self.replaced = []
+
+    def __bool__(self):
+        return bool(
+            self.removed or
+            self.inserted or
+            self.moved or
+            self.replaced
+        )
+
+
+def _longest_increasing_subsequence(sequence):
+    """ returns the set of sequence indexes forming one of its LIS """
+    tails = []
+    tails_indexes = []
+    previous = [None] * len(sequence)
+
+    for i, value in enumerate(sequence):
+        position = bisect.bisect_left(tails, value)
+
+        if position == len(tails):
+            tails.append(value)
+            tails_indexes.append(i)
+        else:
+            tails[position] = value
+            tails_indexes[position] = i
+
+        if position > 0: previous[i] = tails_indexes[position - 1]
+
+    result = set()
+    i = tails_indexes[-1] if tails_indexes else None
+
+    while i is not None:
+        result.add(i)
+        i = previous[i]
+
+    return result
+
+
+def diff(old, new):
+    """ compare two sequences of (uuid, raw) pairs
+
+    Returns HistoryDiff with the uuids that were removed, inserted,
+    moved (the minimal set, everything else keeps its relative order)
+    and replaced (same uuid, different raw contents).
+    """
+    result = HistoryDiff()
+    old_positions = {raw[0]: i for i, raw in enumerate(old)}
+    new_uuids = set(raw[0] for raw in new)
+    common = []
+
+    for uuid, raw in old:
+        if uuid not in new_uuids: result.removed.append(uuid)
+
+    for uuid, raw in new:
+        old_position = old_positions.get(uuid)
+
+        if old_position is None:
+            result.inserted.append(uuid)
+            continue
+
+        if old[old_position][1] != raw: result.replaced.append(uuid)
+        common.append((uuid, old_position))
+
+    stable = _longest_increasing_subsequence([c[1] for c in common])
+    result.moved = [c[0] for i, c in enumerate(common) if i not in stable]
+
+    return result
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+
+# Copyright 2016 Ivan awamper@gmail.com
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import heapq
+import itertools
+import multiprocessing
+import queue
+import threading
+
+from gi.repository import GLib
+
+from draobpilc.lib import fuzzy
+
+# how many texts are matched between two checks for cancellation
+CANCEL_CHECK_INTERVAL = 100
+# times a dead search process is started again before matching moves
+# to the main process
+MAX_RESTARTS = 3
+
+# messages to the search process
+ADD = 'ADD'
+REMOVE = 'REMOVE'
+SEARCH = 'SEARCH'
+CANCEL = 'CANCEL'
+
+
+def _match(texts, keys, term, max_distance, limit, interrupted):
+    """ returns the best (key, score, start, end) and the keys that can
+    still match a longer term, None if interrupted() said so """
+    # max-heap on (score, position) through negation, so heap[0] is
+    # the worst of the best and gets replaced first
+    best = []
+    candidates = []
+    matcher = fuzzy.get_matcher(term, max_distance)
+    # score is match length + start, it can't be less than this
+    min_score = len(term)
+
+    for i, key in enumerate(keys):
+        if i % CANCEL_CHECK_INTERVAL == 0 and interrupted(): return None
+
+        if limit and len(best) == limit and -best[0][0] == min_score:
+            # later texts lose the ties, nothing can get in anymore
+            candidates.extend(keys[i:])
+            break
+
+        text = texts.get(key)
+        if text is None: continue
+
+        match = matcher.match(text)
+        if not match: continue
+
+        candidates.append(key)
+        entry = (-match.score, -i, key, match.start, match.end)
+
+        if not limit or len(best) < limit:
+            heapq.heappush(best, entry)
+        elif entry > best[0]:
+            heapq.heapreplace(best, entry)
+
+    best.sort(reverse=True)
+    return [(e[2], -e[0], e[3], e[4]) for e in best], candidates
+
+
+def _serve(requests, results):
+    """ the search process, keeps its own copy of the texts """
+    texts = {}
+    pending = collections.deque()
+
+    def interrupted():
+        while requests.poll(): pending.append(requests.recv())
+        return any(m[0] in (SEARCH, CANCEL) for m in pending)
+
+    while True:
+        try:
+            message = pending.popleft() if pending else requests.recv()
+        except EOFError:
+            return
+
+        if message[0] == ADD:
+            texts.update(message[1])
+        elif message[0] == REMOVE:
+            for key in message[1]: texts.pop(key, None)
+        elif message[0] == SEARCH:
+            serial, keys, term, max_distance, limit = message[1:]
+            result = _match(
+                texts,
+                keys,
+                term,
+                max_distance,
+                limit,
+                interrupted
+            )
+            if result is not None: results.send((serial,) + result)
+
+
+class SearchJob():
+
+    def __init__(self, serial, snapshot, term, max_distance, limit, callback):
+        self.serial = serial
+        self.texts = dict(snapshot)
+        self.term = term
+        self.max_distance = max_distance
+        self.limit = limit
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class SearchWorker():
+    """ runs fuzzy matching in a separate process so the regex, which
+    holds the GIL, doesn't stall the main loop
+
+    The process keeps its own copy of the texts, add() and retain() send
+    it only what changed. search() takes a snapshot of (key, text) pairs
+    that must be known to it already; only the keys are sent. The
+    callback gets on the main thread the best (key, fuzzy.Result) pairs,
+    at most limit of them sorted by score and then snapshot order, and
+    the keys that can still match a longer term, in snapshot order.
+    Submitting a new search cancels the previous one, its callback is
+    never called.
+
+    A process that dies, killed for memory say, is started again with
+    the texts and the running search. After MAX_RESTARTS of those the
+    matching is done on the main loop.
+    """
+
+    def __init__(self):
+        # the same strings the items hold, to fill a restarted process
+        self._texts = {}
+        self._serials = itertools.count(1)
+        self._current_job = None
+        self._restarts = 0
+        self._process = None
+        self._outbox = None
+        self._start()
+
+    def _start(self):
+        # sent from a thread, pickling big texts takes a while
+        self._outbox = queue.Queue()
+        if self._texts: self._outbox.put((ADD, dict(self._texts)))
+
+        context = multiprocessing.get_context('spawn')
+        requests_reader, requests = context.Pipe(duplex=False)
+        results, results_writer = context.Pipe(duplex=False)
+        self._process = context.Process(
+            target=_serve,
+            args=(requests_reader, results_writer),
+            daemon=True
+        )
+        self._process.start()
+        requests_reader.close()
+        results_writer.close()
+
+        threading.Thread(
+            target=self._send,
+            args=(self._outbox, requests),
+            daemon=True
+        ).start()
+        threading.Thread(
+            target=self._receive,
+            args=(self._process, results),
+            daemon=True
+        ).start()
+
+    def _send(self, outbox, requests):
+        while True:
+            message = outbox.get()
+            if message is None: return
+
+            try:
+                requests.send(message)
+            except (OSError, EOFError):
+                return
+
+    def _receive(self, process, results):
+        while True:
+            try:
+                result = results.recv()
+            except (OSError, EOFError):
+                GLib.idle_add(self._on_process_exit, process)
+                return
+
+            GLib.idle_add(self._deliver, result)
+
+    def _on_process_exit(self, process):
+        if process is not self._process: return GLib.SOURCE_REMOVE
+
+        # ends the thread sending to the dead process
+        self._outbox.put(None)
+
+        if self._restarts < MAX_RESTARTS:
+            self._restarts += 1
+            self._start()
+        else:
+            self._process = None
+            self._outbox = None
+
+        if self._current_job: self._submit(self._current_job)
+        return GLib.SOURCE_REMOVE
+
+    def _submit(self, job):
+        if self._process:
+            self._outbox.put((
+                SEARCH,
+                job.serial,
+                list(job.texts),
+                job.term,
+                job.max_distance,
+                job.limit
+            ))
+        else:
+            GLib.idle_add(self._match_here, job)
+
+    def _match_here(self, job):
+        if job is not self._current_job: return GLib.SOURCE_REMOVE
+
+        result = _match(
+            job.texts,
+            list(job.texts),
+            job.term,
+            job.max_distance,
+            job.limit,
+            lambda: False
+        )
+        return self._deliver((job.serial,) + result)
+
+    def _deliver(self, result):
+        serial, best, candidates = result
+        job = self._current_job
+
+        if job and job.serial == serial and not job.cancelled:
+            self._current_job = None
+            matches = [
+                (key, fuzzy.Result(job.term, job.texts[key], *values))
+                for key, *values in best
+            ]
+            job.callback(matches, candidates)
+
+        return GLib.SOURCE_REMOVE
+
+    def add(self, key, text):
+        self._texts[key] = text
+        if self._outbox: self._outbox.put((ADD, {key: text}))
+
+    def retain(self, keys):
+        removed = [key for key in self._texts if key not in keys]
+        if not removed: return
+
+        for key in removed: del self._texts[key]
+        if self._outbox: self._outbox.put((REMOVE, removed))
+
+    def search(self, snapshot, term, max_distance, limit, callback):
+        self.cancel()
+        job = SearchJob(
+            next(self._serials),
+            snapshot,
+            term,
+            max_distance,
+            limit,
+            callback
+        )
+        self._current_job = job
+        self._submit(job)
+
+        return job
+
+    def cancel(self):
+        if not self._current_job: return
+
+        self._current_job.cancel()
+        self._current_job = None
+        if self._outbox: self._outbox.put((CANCEL,))
+
+    @property
+    def busy(self):
+        return self._current_job is not None
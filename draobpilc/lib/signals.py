@@ -27,30 +27,35 @@ class SignalNotFound(Exception):
 
 
 class Emitter():
+    """ Signals are only made on the first connect(), until then
+    emit() has nobody to notify. Lots of emitters never get any
+    receivers, they shouldn't pay for them """
+
+    __slots__ = ('_signals', '__weakref__')
 
     def __init__(self):
         self._signals = {}
 
     def add_signal(self, name):
-        signal = self._signals.get(name, False)
-        if signal: raise NameAlreadyExists()
-
-        self._signals[name] = Signal()
+        if name in self._signals: raise NameAlreadyExists()
+        self._signals[name] = None
 
     def connect(self, name, callback):
-        signal = self._signals.get(name, False)
-        if not signal: raise SignalNotFound()
+        if name not in self._signals: raise SignalNotFound()
+
+        signal = self._signals[name]
+        if signal is None: signal = self._signals[name] = Signal()
 
         signal.connect(callback, sender=self)
 
     def disconnect(self, name, callback):
-        signal = self._signals.get(name, False)
-        if not signal: raise SignalNotFound()
+        if name not in self._signals: raise SignalNotFound()
 
-        signal.disconnect(callback, sender=self)
+        signal = self._signals[name]
+        if signal is not None: signal.disconnect(callback, sender=self)
 
     def emit(self, name, **kwargs):
-        signal = self._signals.get(name, False)
-        if not signal: raise SignalNotFound()
+        if name not in self._signals: raise SignalNotFound()
 
-        signal.send(self, **kwargs)
+        signal = self._signals[name]
+        if signal is not None: signal.send(self, **kwargs)
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+
+# Copyright 2016 Ivan awamper@gmail.com
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import hashlib
+import os
+import tempfile
+import threading
+
+from gi.repository import GdkPixbuf, GLib
+
+# decoded pixels kept in memory, a 200x200 preview is 160 kB
+MEMORY_CACHE_BYTES = 32 * 1024 * 1024
+DECODE_THREADS = 2
+# freedesktop thumbnail dirs and the longest side of their images
+THUMBNAIL_SIZES = (
+    ('normal', 128),
+    ('large', 256),
+    ('x-large', 512),
+    ('xx-large', 1024)
+)
+THUMBNAILS_DIR = os.path.join(GLib.get_user_cache_dir(), 'thumbnails')
+
+_cache = collections.OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+# last in first out, what was asked for last is what's on screen now
+_jobs = collections.deque()
+# guesses about what's shown next, first in first out and only taken
+# when there are no other jobs
+_prefetch_jobs = collections.deque()
+_jobs_ready = threading.Condition()
+_threads = []
+
+
+class DecodeJob():
+
+    def __init__(self, args, callback):
+        self.args = args
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+def _get_scaled_size(width, height, max_width, max_height, ratio):
+    """ the size new_from_file_at_scale() would give """
+    if ratio:
+        if max_width < 0:
+            width = width * max_height / height
+            height = max_height
+        elif max_height < 0:
+            height = height * max_width / width
+            width = max_width
+        elif height * max_width > width * max_height:
+            width = 0.5 + width * max_height / height
+            height = max_height
+        else:
+            height = 0.5 + height * max_width / width
+            width = max_width
+    else:
+        if max_width > 0: width = max_width
+        if max_height > 0: height = max_height
+
+    return max(int(width), 1), max(int(height), 1)
+
+
+def _get_thumbnail_size(width, height):
+    for name, size in THUMBNAIL_SIZES:
+        if size >= max(width, height): return name, size
+
+    return None
+
+
+def _load_thumbnail(thumbnail_path, mtime):
+    try:
+        pixbuf = GdkPixbuf.Pixbuf.new_from_file(thumbnail_path)
+    except GLib.Error:
+        return None
+
+    if pixbuf.get_option('tEXt::Thumb::MTime') != str(mtime): return None
+    return pixbuf
+
+
+def _save_thumbnail(pixbuf, thumbnail_path, uri, mtime):
+    """ written to a temp file and renamed as the spec asks """
+    directory = os.path.dirname(thumbnail_path)
+
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix='.png', dir=directory)
+        os.close(fd)
+        pixbuf.savev(
+            temp_path,
+            'png',
+            ['tEXt::Thumb::URI', 'tEXt::Thumb::MTime'],
+            [uri, str(mtime)]
+        )
+        os.chmod(temp_path, 0o600)
+        os.replace(temp_path, thumbnail_path)
+    except (OSError, GLib.Error):
+        try:
+            os.remove(temp_path)
+        except (OSError, UnboundLocalError):
+            pass
+
+
+def _decode(filename, mtime, max_width, max_height, ratio):
+    info, original_width, original_height = (
+        GdkPixbuf.Pixbuf.get_file_info(filename)
+    )
+    if not info or original_width <= 0 or original_height <= 0: return None
+
+    width, height = original_width, original_height
+
+    if max_width > 0 or max_height > 0:
+        # same rounding as at_scale() so both give the same size
+        width, height = _get_scaled_size(
+            width,
+            height,
+            max_width,
+            max_height,
+            ratio
+        )
+
+    thumbnail_size = _get_thumbnail_size(width, height)
+
+    # a thumbnail is a scaled copy, the full size one would only be
+    # the original written out again
+    if (
+        (max_width <= 0 and max_height <= 0) or
+        not thumbnail_size or
+        os.path.abspath(filename).startswith(THUMBNAILS_DIR)
+    ):
+        return GdkPixbuf.Pixbuf.new_from_file_at_scale(
+            filename,
+            max_width,
+            max_height,
+            ratio
+        )
+
+    name, size = thumbnail_size
+    uri = GLib.filename_to_uri(os.path.abspath(filename), None)
+    thumbnail_path = os.path.join(
+        THUMBNAILS_DIR,
+        name,
+        hashlib.md5(uri.encode()).hexdigest() + '.png'
+    )
+    thumbnail = _load_thumbnail(thumbnail_path, mtime)
+
+    if not thumbnail:
+        # the spec doesn't scale images up
+        if original_width <= size and original_height <= size:
+            thumbnail = GdkPixbuf.Pixbuf.new_from_file(filename)
+        else:
+            thumbnail = GdkPixbuf.Pixbuf.new_from_file_at_scale(
+                filename,
+                size,
+                size,
+                True
+            )
+
+        _save_thumbnail(thumbnail, thumbnail_path, uri, mtime)
+
+    if (
+        width == thumbnail.get_width() and
+        height == thumbnail.get_height()
+    ):
+        return thumbnail
+
+    return thumbnail.scale_simple(width, height, GdkPixbuf.InterpType.BILINEAR)
+
+
+def _get_key(filename, max_width, max_height, ratio):
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+
+    return (
+        filename,
+        int(stat.st_mtime),
+        stat.st_size,
+        int(max_width),
+        int(max_height),
+        ratio
+    )
+
+
+def get_pixbuf(filename, max_width=-1, max_height=-1, ratio=True):
+    """ filename scaled like new_from_file_at_scale(), None if it can't be
+
+    Results are kept in memory, the freedesktop thumbnail of a fitting
+    size is used or written so the original is only decoded once.
+    """
+    key = _get_key(filename, max_width, max_height, ratio)
+    if not key: return None
+
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    filename, mtime, size, max_width, max_height, ratio = key
+
+    try:
+        pixbuf = _decode(filename, mtime, max_width, max_height, ratio)
+    except GLib.Error:
+        pixbuf = None
+
+    with _lock: _cache_put(key, pixbuf)
+    return pixbuf
+
+
+def _get_byte_length(pixbuf):
+    return pixbuf.get_byte_length() if pixbuf else 0
+
+
+def _cache_put(key, pixbuf):
+    """ call with _lock held, evicts the least recently used pixbufs
+    until the cache is under MEMORY_CACHE_BYTES """
+    global _cache_bytes
+
+    if key in _cache: _cache_bytes -= _get_byte_length(_cache.pop(key))
+    _cache[key] = pixbuf
+    _cache_bytes += _get_byte_length(pixbuf)
+
+    while _cache_bytes > MEMORY_CACHE_BYTES:
+        evicted_key, evicted = _cache.popitem(last=False)
+        _cache_bytes -= _get_byte_length(evicted)
+
+
+def can_decode(filename):
+    """ whether a pixbuf loader knows the file, only reads its header """
+    try:
+        info, width, height = GdkPixbuf.Pixbuf.get_file_info(filename)
+    except GLib.Error:
+        return False
+
+    return info is not None
+
+
+def get_cached(filename, max_width=-1, max_height=-1, ratio=True):
+    """ the pixbuf if it's in memory already, doesn't decode anything """
+    key = _get_key(filename, max_width, max_height, ratio)
+
+    with _lock:
+        pixbuf = _cache.get(key)
+        if pixbuf: _cache.move_to_end(key)
+
+    return pixbuf
+
+
+def _next_job():
+    with _jobs_ready:
+        while not _jobs and not _prefetch_jobs: _jobs_ready.wait()
+        if _jobs: return _jobs.pop()
+        return _prefetch_jobs.popleft()
+
+
+def _run():
+    while True:
+        job = _next_job()
+        if job.cancelled: continue
+
+        # a dead thread is never replaced, any odd file shows as broken
+        try:
+            pixbuf = get_pixbuf(*job.args)
+        except Exception:
+            pixbuf = None
+
+        GLib.idle_add(_deliver, job, pixbuf)
+
+
+def _deliver(job, pixbuf):
+    if not job.cancelled and job.callback: job.callback(pixbuf)
+    return GLib.SOURCE_REMOVE
+
+
+def get_pixbuf_async(
+    filename,
+    max_width=-1,
+    max_height=-1,
+    ratio=True,
+    callback=None
+):
+    """ get_pixbuf() on a decode thread, callback(pixbuf) is called on
+    the main loop unless the returned DecodeJob gets cancelled first """
+    job = DecodeJob((filename, max_width, max_height, ratio), callback)
+    _put_job(_jobs, job)
+    return job
+
+
+def prefetch_pixbuf_async(filename, max_width=-1, max_height=-1, ratio=True):
+    """ get_pixbuf() on a decode thread once nothing else waits, so the
+    pixbuf is in memory when it's asked for. Cancel the returned DecodeJob
+    when it isn't likely needed anymore """
+    job = DecodeJob((filename, max_width, max_height, ratio), None)
+    _put_job(_prefetch_jobs, job)
+    return job
+
+
+def _put_job(jobs, job):
+    with _jobs_ready:
+        jobs.append(job)
+        _jobs_ready.notify()
+
+    while len(_threads) < DECODE_THREADS:
+        thread = threading.Thread(target=_run, daemon=True)
+        thread.start()
+        _threads.append(thread)
+
+
+def clear():
+    global _cache_bytes
+
+    with _lock:
+        _cache.clear()
+        _cache_bytes = 0
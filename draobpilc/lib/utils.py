@@ -34,6 +34,8 @@ simple_url_2_re = re.compile(
     r'^www\.|^(?!http)\w[^@]+\.(com|edu|gov|int|mil|net|org)($|/.*)$',
     re.IGNORECASE
 )
+# extract_urls() splits words on these, so a url can't have any
+url_separators_re = re.compile(r'''[\s<>"']''')
 
 
 class SettingsSchemaNotFound(Exception):
@@ -127,6 +129,9 @@ def get_settings(schema_id, schema_dir=None):
 
 def is_url(string):
     result = False
+    # don't scan every word of a long text that can't be a single url
+    if url_separators_re.search(string): return result
+
     urls = extract_urls(string)
 
     if len(urls) == 1 and len(urls[0]) == len(string):
@@ -48,7 +48,7 @@ class Editor(ItemsProcessorBase):
         contents = self._text_window.buffer.props.text
 
         if contents and contents != self.item.raw:
-            gpaste_client.replace(self.item.uuid, contents)
+            gpaste_client.replace_async(self.item.uuid, contents)
 
     def clear(self):
         super().clear()
@@ -59,8 +59,13 @@ class Editor(ItemsProcessorBase):
     def set_items(self, items):
         self.items = items
         self._text_window.set_sensitive(True)
+        self._text_window.set_language(self.item.uuid, text=self.item.raw)
         self._text_window.buffer.set_text(self.item.raw)
-        self._text_window.set_filename(None)
+
+    def prefetch(self, items):
+        for item in items:
+            if not self.can_process([item]): continue
+            self._text_window.get_language(item.uuid, text=item.raw)
 
     def can_process(self, items):
         if (
@@ -15,6 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import codecs
 import os
 
 from gi.repository import Gtk
@@ -23,6 +24,7 @@ from gi.repository import Gdk
 
 from draobpilc import common
 from draobpilc.history_item_kind import HistoryItemKind
+from draobpilc.lib import thumbnails
 from draobpilc.widgets.item_thumb import ItemThumb
 from draobpilc.processors.processor_textwindow import TextWindow
 from draobpilc.widgets.items_processor_base import (
@@ -30,6 +32,75 @@ from draobpilc.widgets.items_processor_base import (
     ItemsProcessorPriority
 )
 
+# files are read this much at a time, more comes when scrolled to the end
+PREVIEW_CHUNK_SIZE = 64 * 1024
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16')
+)
+
+
+class ChunkedFileReader():
+    """ decodes a text file a chunk at a time
+
+    Binary detection and encoding sniffing only look at the first chunk.
+    """
+
+    def __init__(self, filename, chunk_size=PREVIEW_CHUNK_SIZE):
+        self._file = open(filename, 'rb')
+        self._chunk_size = chunk_size
+        self._first_chunk = self._file.read(chunk_size)
+        self.encoding = self._sniff_encoding(self._first_chunk)
+        # utf-16 and utf-32 text is full of zero bytes
+        self.is_binary = (
+            self.encoding not in ('utf-16', 'utf-32') and
+            b'\0' in self._first_chunk
+        )
+        self._decoder = codecs.getincrementaldecoder(self.encoding)(
+            errors='replace'
+        )
+
+    def _sniff_encoding(self, chunk):
+        for bom, encoding in _BOMS:
+            if chunk.startswith(bom): return encoding
+
+        # a char cut in half at the end of the chunk is fine,
+        # unless it's the end of the file
+        final = len(chunk) < self._chunk_size
+
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(chunk, final)
+        except UnicodeDecodeError:
+            return 'latin-1'
+        else:
+            return 'utf-8'
+
+    def read(self):
+        """ next chunk of text, '' once the whole file was read """
+        if self._file.closed: return ''
+
+        if self._first_chunk is not None:
+            chunk = self._first_chunk
+            self._first_chunk = None
+        else:
+            chunk = self._file.read(self._chunk_size)
+
+        final = len(chunk) < self._chunk_size
+        text = self._decoder.decode(chunk, final)
+        if final: self.close()
+
+        return text
+
+    def close(self):
+        self._file.close()
+
+    @property
+    def eof(self):
+        return self._file.closed
+
 
 class Previewer(ItemsProcessorBase):
 
@@ -41,6 +112,8 @@ class Previewer(ItemsProcessorBase):
 
         self._thumb_max_width = Previewer.THUMB_MAX_WIDTH
         self._thumb_max_height = Previewer.THUMB_MAX_HEIGHT
+        self._reader = None
+        self._prefetch_jobs = []
 
         self._thumb = ItemThumb()
         self._thumb.set_vexpand(True)
@@ -81,6 +154,10 @@ class Previewer(ItemsProcessorBase):
         self._text_window.textview.set_editable(False)
         self._text_window.hide()
 
+        adjustment = self._text_window.window.get_vadjustment()
+        adjustment.connect('value-changed', self._on_adjustment_changed)
+        adjustment.connect('changed', self._on_adjustment_changed)
+
         self.grid.set_name('PreviwerGrid')
         self.grid.attach(self._path_entry, 0, 0, 2, 1)
         self.grid.attach(self._thumb_eventbox, 0, 1, 2, 1)
@@ -100,6 +177,39 @@ class Previewer(ItemsProcessorBase):
         app_info.launch_uris(['file://%s' % self._path_entry.get_text()], None)
         common.APPLICATION.hide()
 
+    def _on_adjustment_changed(self, adjustment):
+        if not self._reader: return
+
+        bottom = adjustment.get_value() + adjustment.get_page_size() * 2
+        if bottom >= adjustment.get_upper(): self._read_more()
+
+    def _read_more(self):
+        text = self._reader.read()
+        if self._reader.eof: self._reader = None
+
+        if text:
+            buffer_ = self._text_window.buffer
+            buffer_.insert(buffer_.get_end_iter(), text)
+
+    def _close_reader(self):
+        if not self._reader: return
+
+        self._reader.close()
+        self._reader = None
+
+    def _open_reader(self, filename):
+        """ reader for a text file, None if it's binary or can't be read """
+        try:
+            reader = ChunkedFileReader(filename)
+        except OSError:
+            return None
+
+        if reader.is_binary:
+            reader.close()
+            return None
+
+        return reader
+
     def _is_previewable_type(self, content_type):
         if not content_type: return False
 
@@ -126,6 +236,7 @@ class Previewer(ItemsProcessorBase):
 
     def clear(self):
         super().clear()
+        self._close_reader()
 
         self._path_entry.set_text('')
         self._text_window.buffer.set_text('')
@@ -137,6 +248,7 @@ class Previewer(ItemsProcessorBase):
 
     def set_items(self, items):
         self.items = items
+        self._close_reader()
         self._path_entry.set_text(self.item.raw)
         exists = os.path.exists(self.item.raw)
 
@@ -145,19 +257,30 @@ class Previewer(ItemsProcessorBase):
             self._preview_supported(self.item) and
             self._is_previewable_type(self.item.content_type)
         ):
+            self._reader = self._open_reader(self.item.raw)
+
+        if self._reader:
             self._thumb_eventbox.hide()
             self._text_window.show()
             self._path_entry.show()
 
-            with open(self.item.raw, 'r') as fp:
-                contents = fp.read()
-                self._text_window.set_filename(self.item.raw)
-                self._text_window.buffer.set_text(contents)
+            # only the first chunk now, the rest when scrolled to
+            text = self._reader.read()
+            if self._reader.eof: self._reader = None
+
+            self._text_window.set_language(
+                (self.item.raw, self.item.content_type),
+                self.item.raw,
+                self.item.content_type,
+                text
+            )
+            self._text_window.buffer.set_text(text)
         elif self.item.thumb_path:
             self._thumb.set_filename(
                 self.item.thumb_path,
-                self._thumb_max_width * 0.8,
-                self._thumb_max_height * 0.8
+                int(self._thumb_max_width * 0.8),
+                int(self._thumb_max_height * 0.8),
+                progressive=True
             )
             self._text_window.hide()
             self._thumb_eventbox.show()
@@ -167,8 +290,28 @@ class Previewer(ItemsProcessorBase):
             self._thumb_eventbox.hide()
 
             self._text_window.show()
+            self._text_window.set_language(self.item.uuid, text=self.item.raw)
             self._text_window.buffer.set_text(self.item.raw)
-            self._text_window.set_filename(None)
+
+    def prefetch(self, items):
+        # the pointer moved on, the old guesses only hold up the decoders
+        for job in self._prefetch_jobs: job.cancel()
+        self._prefetch_jobs = []
+
+        for item in items:
+            # looking the file up would block, the row view usually did it.
+            # Text files are read when shown, their first chunk is cheap
+            if (
+                not item.file_info_loaded or
+                not item.thumb_path or
+                self._is_previewable_type(item.content_type)
+            ): continue
+
+            self._prefetch_jobs.append(thumbnails.prefetch_pixbuf_async(
+                item.thumb_path,
+                int(self._thumb_max_width * 0.8),
+                int(self._thumb_max_height * 0.8)
+            ))
 
     def can_process(self, items):
         if (
@@ -15,8 +15,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
+
 from gi import require_version
 
+from gi.repository import Gio
 from gi.repository import Gtk
 from gi.repository import GLib
 from gi.repository import GObject
@@ -35,6 +38,11 @@ from draobpilc import common
 
 WRAP_MODE_LABEL = '<span fgcolor="grey" size="small"><b>%s</b></span>'
 WRAP_MODE_LABEL = WRAP_MODE_LABEL % _('wrap text')
+# content types are guessed from this much of the text
+LANGUAGE_SNIFF_LENGTH = 4096
+LANGUAGES_CACHE_SIZE = 256
+
+_languages = collections.OrderedDict()
 
 
 class TextWindow(Gtk.Overlay):
@@ -134,13 +142,52 @@ class TextWindow(Gtk.Overlay):
             common.SETTINGS[common.EDITOR_WRAP_TEXT] = wrap
             self.textview.set_wrap_mode(Gtk.WrapMode.NONE)
 
-    def set_filename(self, filename=None):
+    def get_language(
+        self,
+        key=None,
+        filename=None,
+        content_type=None,
+        text=None
+    ):
+        """ guessed from filename and content type, the type is guessed
+        from the start of text when not given. Remembered by key (an item
+        uuid, a filename and content type) when there's one """
+        if not self.lang_manager: return None
+
+        prefix = text[:LANGUAGE_SNIFF_LENGTH] if text else ''
+        # same key with other contents, an edited item for example
+        if key is not None: key = (key, content_type, hash(prefix))
+
+        if key is not None and key in _languages:
+            _languages.move_to_end(key)
+            return _languages[key]
+
+        if not content_type and (filename or prefix):
+            content_type, uncertain = Gio.content_type_guess(
+                filename,
+                prefix.encode()
+            )
+
+        lang = self.lang_manager.guess_language(filename, content_type)
+
+        if key is not None:
+            _languages[key] = lang
+            if len(_languages) > LANGUAGES_CACHE_SIZE:
+                _languages.popitem(last=False)
+
+        return lang
+
+    def set_language(
+        self,
+        key=None,
+        filename=None,
+        content_type=None,
+        text=None
+    ):
+        """ set it before filling the buffer so it's highlighted once,
+        see get_language() for the arguments """
         if not self.lang_manager: return
-
-        lang = self.lang_manager.guess_language(
-            filename,
-            self.buffer.props.text
-        )
+        lang = self.get_language(key, filename, content_type, text)
 
         if lang:
             self.buffer.set_language(lang)
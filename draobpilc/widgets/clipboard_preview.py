@@ -74,6 +74,12 @@ class ClipboardPreview(PreviewWindow):
         self._title.set_valign(Gtk.Align.CENTER)
         self._title.set_halign(Gtk.Align.FILL)
 
+        # shown until the clipboard contents arrive
+        self._spinner = Gtk.Spinner()
+        self._spinner.set_name('ClipboardPreviewSpinner')
+        self._spinner.set_size_request(32, 32)
+        self._spinner.set_no_show_all(True)
+
         self._editor = editor.Editor()
         self._previewer = previewer.Previewer()
 
@@ -91,6 +97,7 @@ class ClipboardPreview(PreviewWindow):
         self._bottom_box.set_orientation(Gtk.Orientation.HORIZONTAL)
 
         self.box.add(self._title)
+        self.box.add(self._spinner)
         self.box.add(self._items_processors)
         self.box.add(self._bottom_box)
 
@@ -112,7 +119,16 @@ class ClipboardPreview(PreviewWindow):
         )
         self._previewer.reload()
 
+    def set_loading(self):
+        self._items_processors.set_items(None)
+        for child in self._bottom_box.get_children(): child.destroy()
+
+        self._spinner.show()
+        self._spinner.start()
+
     def set_item(self, history_item):
+        self._spinner.stop()
+        self._spinner.hide()
         self._items_processors.set_items([history_item])
 
         for child in self._bottom_box.get_children(): child.destroy()
@@ -175,42 +191,98 @@ PREVIEW_WINDOW = ClipboardPreview()
 PREVIEW_WINDOW.connect('key-release-event', lambda _, __: hide())
 _current_window = PREVIEW_WINDOW
 
+# the item for the clipboard contents, kept until the owner changes
+_clipboard = Gtk.Clipboard.get_default(Gdk.Display.get_default())
+_item = None
+_item_cached = False
+_serial = 0
 
-def get_history_item_for_clipboard():
-    clipboard = Gtk.Clipboard.get_default(Gdk.Display.get_default())
 
-    if clipboard.wait_is_image_available():
-        kind = HistoryItemKind.IMAGE
-    elif clipboard.wait_is_uris_available():
-        kind = HistoryItemKind.FILE
-    else:
-        kind = HistoryItemKind.TEXT
+def _on_owner_change(clipboard, event):
+    global _item, _item_cached, _serial
 
-    text = clipboard.wait_for_text()
+    _item = None
+    _item_cached = False
+    _serial += 1
 
-    if text:
-        item = HistoryItem.new_from_raw(text, kind)
-    else:
-        item = None
 
-    return item
+_clipboard.connect('owner-change', _on_owner_change)
 
 
-def show():
-    item = get_history_item_for_clipboard()
+def request_history_item(callback):
+    """ callback(item) with the clipboard contents as a HistoryItem or
+    None, without blocking: targets are asked for first and the text only
+    if there's any """
+    serial = _serial
+    kind = HistoryItemKind.TEXT
+
+    if _item_cached:
+        callback(_item)
+        return
+
+    def set_item(item):
+        global _item, _item_cached
+
+        if serial != _serial: return
+
+        _item = item
+        _item_cached = True
+        callback(item)
+
+    def on_text(clipboard, text, *args):
+        if text: set_item(HistoryItem.new_from_raw(text, kind))
+        else: set_item(None)
+
+    def on_targets(clipboard, targets, *args):
+        nonlocal kind
+
+        if not targets or not Gtk.targets_include_text(targets):
+            set_item(None)
+            return
+
+        if Gtk.targets_include_image(targets, False):
+            kind = HistoryItemKind.IMAGE
+        elif Gtk.targets_include_uri(targets):
+            kind = HistoryItemKind.FILE
+
+        clipboard.request_text(on_text)
 
-    if not item:
+    _clipboard.request_targets(on_targets)
+
+
+def _set_item(item):
+    global _current_window
+
+    if not _current_window.is_visible(): return
+
+    if not item and _current_window == PREVIEW_WINDOW:
+        PREVIEW_WINDOW.hide()
         _current_window = EMPTY_WINDOW
-    else:
-        _current_window = PREVIEW_WINDOW
+        _present()
+    elif item:
+        _current_window.set_item(item)
 
-    _current_window.set_item(item)
+
+def _present():
     _current_window.show_all()
     _current_window.maximize()
     _current_window.get_window().focus(Gdk.CURRENT_TIME)
     _current_window.present_with_time(Gdk.CURRENT_TIME)
 
 
+def show():
+    global _current_window
+
+    if _item_cached and not _item:
+        _current_window = EMPTY_WINDOW
+    else:
+        _current_window = PREVIEW_WINDOW
+
+    if not _item_cached: PREVIEW_WINDOW.set_loading()
+    _present()
+    request_history_item(_set_item)
+
+
 def hide():
     _current_window.hide()
 
@@ -107,12 +107,15 @@ class HistoriesManagerItem(Gtk.Box):
 
         self._wait_for_confirm = None
         self.name = name
-        self.size = gpaste_client.get_history_size(self.name)
+        self.size = None
 
         self.link = Gtk.LinkButton()
-        self.link.set_label(NAME_TEMPLATE % (self.name, self.size))
+        self.link.set_label(self.name)
         self.link.set_halign(Gtk.Align.START)
 
+        future = gpaste_client.get_history_size_async(self.name)
+        future.add_done_callback(self._on_history_size)
+
         self.backup_btn = ItemButton(
             'document-save-symbolic',
             ITEM_BUTTON_SIZE,
@@ -173,6 +176,12 @@ class HistoriesManagerItem(Gtk.Box):
 
         self.set_active(False)
 
+    def _on_history_size(self, future):
+        if future.exception(): return
+
+        self.size = future.result()
+        self.link.set_label(NAME_TEMPLATE % (self.name, self.size))
+
     def _hide_confirm_dialog(self):
         self._confirmation_revealer.set_transition_type(
             Gtk.RevealerTransitionType.SLIDE_UP
@@ -282,24 +291,14 @@ class HistoriesManager(Gtk.Box):
         else:
             pass
 
-    def _set_active(self, name):
-        self.link.set_label(name)
-
-    def _clear(self):
-        for child in self._box:
-            if child != self._entry: child.destroy()
-
-    def _switch_history(self, name):
-        gpaste_client.switch_history(name)
-        self.popover.hide()
+    def _on_histories(self, future):
+        histories, current_name = future.result()
+        if histories.exception() or current_name.exception(): return
 
-    def update(self, *args, **kwargs):
         self._clear()
         self.link.set_sensitive(True)
-        histories = gpaste_client.list_histories()
-        current_name = gpaste_client.get_history_name()
 
-        for history_name in histories:
+        for history_name in histories.result():
             histories_manager_item = HistoriesManagerItem(history_name)
             histories_manager_item.link.connect(
                 'activate-link',
@@ -312,11 +311,29 @@ class HistoriesManager(Gtk.Box):
             )
             self._box.add(histories_manager_item)
 
-            if history_name == current_name:
+            if history_name == current_name.result():
                 self._set_active(history_name)
                 histories_manager_item.set_active(True)
 
         self._box.show_all()
 
+    def _set_active(self, name):
+        self.link.set_label(name)
+
+    def _clear(self):
+        for child in self._box:
+            if child != self._entry: child.destroy()
+
+    def _switch_history(self, name):
+        gpaste_client.switch_history(name)
+        self.popover.hide()
+
+    def update(self, *args, **kwargs):
+        futures = [
+            gpaste_client.list_histories_async(),
+            gpaste_client.get_history_name_async()
+        ]
+        gpaste_client.when_all(futures).add_done_callback(self._on_histories)
+
     def show(self):
         self.popover.show()
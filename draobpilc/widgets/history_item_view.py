@@ -332,6 +332,7 @@ class HistoryItemView(Gtk.Box):
         overlay.add_overlay(self._shortcut_hint)
 
         self.add(overlay)
+        self.set_label(self.item.label)
         self.show_all()
 
     def _on_enter_event(self, box, event):
@@ -19,6 +19,7 @@ from gi.repository import Gtk
 from gi.repository import GdkPixbuf
 
 from draobpilc import common
+from draobpilc.lib import thumbnails
 
 MARGIN = common.SETTINGS[common.ITEM_PREVIEW_MARGIN]
 DEFAULT_WIDTH = (
@@ -27,9 +28,15 @@ DEFAULT_WIDTH = (
 DEFAULT_HEIGHT = (
     common.SETTINGS[common.ITEM_MAX_HEIGHT] - MARGIN * 2
 )
+PLACEHOLDER_ICON = 'image-x-generic'
+BROKEN_ICON = 'image-missing'
+# progressive thumbs first show one this many times smaller
+LOW_RES_SCALE = 4
 
 
 class ItemThumb(Gtk.Image):
+    """ images are decoded on a thread once the thumb gets drawn, with a
+    placeholder until then. Decoding is dropped if it scrolls away. """
 
     def __init__(
         self,
@@ -42,19 +49,126 @@ class ItemThumb(Gtk.Image):
         self.set_margin_left(MARGIN)
         self.set_margin_top(MARGIN)
         self.set_margin_bottom(MARGIN)
+        self.connect('draw', self._on_draw)
+        self.connect('destroy', lambda _: self._cancel_jobs())
 
         self._filename = None
+        self._size = None
+        self._progressive = False
+        self._pending = False
+        self._jobs = []
+        self._adjustment = None
+        self._adjustment_handler_id = 0
+
         if filename: self.set_filename(filename, max_width, max_height, ratio)
 
-    def set_filename(self, filename, max_width, max_height, ratio=True):
+    def _on_draw(self, image, cairo_context):
+        if self._pending and not self._jobs: self._start_jobs()
+
+    def _on_adjustment_changed(self, adjustment):
+        allocation = self.get_allocation()
+        top = adjustment.get_value()
+        bottom = top + adjustment.get_page_size()
+
+        if (
+            allocation.y + allocation.height < top or
+            allocation.y > bottom
+        ):
+            # it starts over on the next draw
+            self._cancel_jobs()
+
+    def _start_jobs(self):
+        max_width, max_height, ratio = self._size
+
+        self._jobs.append(thumbnails.get_pixbuf_async(
+            self._filename,
+            max_width,
+            max_height,
+            ratio,
+            self._on_pixbuf
+        ))
+
+        if self._progressive:
+            # queued last so it's picked first
+            low_width, low_height = [
+                max(size // LOW_RES_SCALE, 1) if size > 0 else size
+                for size in (max_width, max_height)
+            ]
+            self._jobs.append(thumbnails.get_pixbuf_async(
+                self._filename,
+                low_width,
+                low_height,
+                ratio,
+                self._on_low_res_pixbuf
+            ))
+
+        scrolled_window = self.get_ancestor(Gtk.ScrolledWindow)
+        if not scrolled_window: return
+
+        self._adjustment = scrolled_window.get_vadjustment()
+        self._adjustment_handler_id = self._adjustment.connect(
+            'value-changed',
+            self._on_adjustment_changed
+        )
+
+    def _cancel_jobs(self):
+        for job in self._jobs: job.cancel()
+        self._jobs = []
+
+        if self._adjustment_handler_id:
+            self._adjustment.disconnect(self._adjustment_handler_id)
+            self._adjustment_handler_id = 0
+            self._adjustment = None
+
+    def _on_low_res_pixbuf(self, pixbuf):
+        if not pixbuf or not self._pending: return
+
+        self.set_from_pixbuf(pixbuf.scale_simple(
+            pixbuf.get_width() * LOW_RES_SCALE,
+            pixbuf.get_height() * LOW_RES_SCALE,
+            GdkPixbuf.InterpType.BILINEAR
+        ))
+
+    def _on_pixbuf(self, pixbuf):
+        self._pending = False
+        self._cancel_jobs()
+
+        if pixbuf: self.set_from_pixbuf(pixbuf)
+        else: self.set_from_icon_name(BROKEN_ICON, Gtk.IconSize.DIALOG)
+
+    def set_filename(
+        self,
+        filename,
+        max_width,
+        max_height,
+        ratio=True,
+        progressive=False
+    ):
+        self._cancel_jobs()
         self._filename = filename
-        pixbuf = ItemThumb.get_pixbuf(filename, max_width, max_height, ratio)
-        self.set_from_pixbuf(pixbuf)        
+        self._size = (max_width, max_height, ratio)
+        self._progressive = progressive
+
+        pixbuf = thumbnails.get_cached(filename, max_width, max_height, ratio)
+
+        if pixbuf:
+            self._pending = False
+            self.set_from_pixbuf(pixbuf)
+        else:
+            self._pending = True
+            self.set_from_icon_name(PLACEHOLDER_ICON, Gtk.IconSize.DIALOG)
+            self.queue_draw()
+
+    def clear(self):
+        self._cancel_jobs()
+        self._pending = False
+        super().clear()
 
     def resize(self, width, height):
         old_pixbuf = self.props.pixbuf
 
         if (
+            old_pixbuf and
             old_pixbuf.props.width == width and
             old_pixbuf.props.height == height
         ): return None
@@ -64,9 +178,12 @@ class ItemThumb(Gtk.Image):
         if height > 0:
             height = height - MARGIN * 2
 
-        self.clear()
-        new_pixbuf = ItemThumb.get_pixbuf(self._filename, width, height)
-        if new_pixbuf: self.set_from_pixbuf(new_pixbuf)
+        if (
+            width < 1 and width != -1 or
+            height < 1 and height != -1
+        ): return None
+
+        self.set_filename(self._filename, width, height)
 
     @staticmethod
     def get_pixbuf(
@@ -80,11 +197,4 @@ class ItemThumb(Gtk.Image):
             max_height < 1 and max_height != -1
         ): return None
 
-        pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
-            filename,
-            max_width,
-            max_height,
-            ratio
-        )
-
-        return pixbuf
+        return thumbnails.get_pixbuf(filename, max_width, max_height, ratio)
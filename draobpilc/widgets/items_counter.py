@@ -31,6 +31,7 @@ class ItemsCounter(Gtk.Label):
 
         self._list_box = None
         self._history_items = None
+        self._n_shown = None
 
         self.bind(list_box)
         self.show()
@@ -39,6 +40,11 @@ class ItemsCounter(Gtk.Label):
     def set_history_items(self, items):
         self._history_items = items
 
+    def set_n_shown(self, n_shown):
+        """ for views that don't keep a row for every shown item """
+        self._n_shown = n_shown
+        self.update()
+
     def bind(self, list_box):
         if isinstance(list_box, Gtk.ListBox):
             self._list_box = list_box
@@ -50,14 +56,15 @@ class ItemsCounter(Gtk.Label):
             self.set_markup(LABEL_TEMPLATE % 0)
             return
 
-        children = self._list_box.get_children()
+        n_shown = self._n_shown
+        if n_shown is None: n_shown = len(self._list_box.get_children())
 
         if (
             self._history_items.filter_mode or
-            len(children) < self._history_items.n_total
+            n_shown < self._history_items.n_total
         ):
             label = LABEL_FILTER_TEMPLATE % (
-                len(children),
+                n_shown,
                 self._history_items.n_total,
             )
         else:
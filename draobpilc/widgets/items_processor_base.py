@@ -62,6 +62,12 @@ class ItemsProcessorBase(Gtk.Bin):
     def reload(self):
         if self.items: self.set_items(self.items)
 
+    def prefetch(self, items):
+        """ called when idle with the items likely shown next, each call
+        replaces the previous ones. For any item: check what can_process()
+        would without blocking """
+        pass
+
     @property
     def item(self):
         item = None
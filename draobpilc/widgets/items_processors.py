@@ -53,11 +53,17 @@ class ItemsProcessors(Gtk.Box):
 
         self._items = []
         self._timeout_id = 0
+        self._prefetch_id = 0
         self._show_switcher = True
 
     def __iter__(self):
         return iter(self.processors)
 
+    def _get_key(self, items):
+        """ items are the same for processors if their contents are """
+        if items is None: return None
+        return tuple((item.uuid, item.raw) for item in items)
+
     def _get_for_items(self, items):
         result = None
 
@@ -105,46 +111,66 @@ class ItemsProcessors(Gtk.Box):
                 processor.title
             )
 
-    def set_items(self, items, timeout=0):
+    def _apply_items(self, items, prefetch):
+        self._timeout_id = 0
+        key = self._get_key(items)
+        self._items = list(items or [])
 
-        def on_timeout():
-            self._timeout_id = 0
+        for processor in self:
+            if items and processor.can_process(items):
+                processor.set_sensitive(True)
 
-            if not items:
-                self._items.clear()
+                # hovering back and forth shouldn't refill the buffers
+                if self._get_key(processor.items) != key:
+                    processor.set_items(list(items))
             else:
-                self._items = items
-
-            for processor in self:
-                if items is None:
-                    processor.clear()
-                    processor.set_sensitive(False)
-                else:
-                    if processor.can_process(items):
-                        processor.set_sensitive(True)
-                        processor.set_items(items)
-                    else:
-                        processor.set_sensitive(False)
-                        processor.clear()
-
-            processor = self._get_for_items(self._items)
-
-            if processor:
-                self._stack.set_visible_child(processor)
-            else:
-                self._stack.set_visible_child(self.default)
+                processor.set_sensitive(False)
+                if processor.items: processor.clear()
+
+        processor = self._get_for_items(self._items)
+
+        if processor:
+            self._stack.set_visible_child(processor)
+        else:
+            self._stack.set_visible_child(self.default)
+
+        self._update_switcher()
+        if prefetch: self.prefetch(prefetch)
 
-            self._update_switcher()
+        return GLib.SOURCE_REMOVE
 
+    def set_items(self, items, timeout=0, prefetch=None):
+        """ only the last of quick successive calls gets applied, and
+        only if it differs from what's shown. prefetch are items likely
+        to come next, processors can prepare for them when idle """
         if self._timeout_id:
             GLib.source_remove(self._timeout_id)
             self._timeout_id = 0
-        if self._items == items: return
+        if self._get_key(self._items) == self._get_key(items): return
 
         if timeout:
-            self._timeout_id = GLib.timeout_add(timeout, on_timeout)
+            self._timeout_id = GLib.timeout_add(
+                timeout,
+                self._apply_items,
+                items,
+                prefetch
+            )
         else:
-            on_timeout()
+            self._apply_items(items, prefetch)
+
+    def prefetch(self, items):
+        def on_idle():
+            self._prefetch_id = 0
+
+            for processor in self: processor.prefetch(items)
+
+            return GLib.SOURCE_REMOVE
+
+        if self._prefetch_id: GLib.source_remove(self._prefetch_id)
+        self._prefetch_id = GLib.idle_add(
+            on_idle,
+            priority=GLib.PRIORITY_LOW
+        )
 
     @property
     def processors(self):
@@ -19,8 +19,10 @@ from gi.repository import Gtk
 from gi.repository import Gdk
 from gi.repository import GLib
 from gi.repository import GObject
+from gi.repository import Pango
 
 from draobpilc import common
+from draobpilc.history_item import HistoryItem
 from draobpilc.lib import utils
 from draobpilc.lib import fuzzy
 from draobpilc.widgets.histories_manager import HistoriesManager
@@ -36,6 +38,12 @@ class ItemsView(Gtk.Box):
     AUTOSCROLL_BORDER_OFFSET = 100
     AUTOSCROLL_TIMEOUT_MS = 50
     AUTOSCROLL_STEP = 10
+    # rows are only made for what's scrolled into view plus this many
+    REALIZE_STEP = 30
+    # Ctrl+1 to Ctrl+9
+    N_SHORTCUTS = 9
+    # narrow chars fit more per line than the average width says
+    MIN_CHAR_WIDTH_RATIO = 0.5
 
     __gsignals__ = {
         'item-activated': (GObject.SIGNAL_RUN_FIRST, None, (object,)),
@@ -58,7 +66,24 @@ class ItemsView(Gtk.Box):
         self._last_entered_item = None
         self._last_selected_index = None
         self._show_index = None
+        self._limit = None
+        self._n_realized = ItemsView.REALIZE_STEP
         self._autoscroll_timeout_id = 0
+        self._labels_update_id = 0
+        self._rows = {}
+        self._rows_by_raw = {}
+        self._row_keys = {}
+        self._hinted_rows = []
+        self._active_row = None
+        self._first_selected_row = None
+
+        # what the clipboard holds, asked for again after owner changes
+        self._clipboard = Gtk.Clipboard.get_default(Gdk.Display.get_default())
+        self._clipboard.connect('owner-change', self._on_owner_change)
+        self._clipboard_text = None
+        self._clipboard_cached = False
+        self._clipboard_requested = False
+        self._clipboard_serial = 0
 
         self._histories_manager = HistoriesManager()
 
@@ -79,6 +104,7 @@ class ItemsView(Gtk.Box):
         self._listbox.connect('leave-notify-event', self._on_leave_event)
         self._listbox.connect('button-press-event', self._on_button_press_event)
         self._listbox.connect('button-release-event', self._on_button_release_event)
+        self._listbox.connect('size-allocate', self._on_size_allocate)
 
         self._items_counter = ItemsCounter(self._listbox)
         self._load_rest_btn = Gtk.LinkButton()
@@ -96,6 +122,10 @@ class ItemsView(Gtk.Box):
         scrolled.set_hexpand(True)
         scrolled.add(self._listbox)
 
+        adjustment = scrolled.get_vadjustment()
+        adjustment.connect('value-changed', self._on_adjustment_changed)
+        adjustment.connect('changed', self._on_adjustment_changed)
+
         bottom_box = Gtk.Box()
         bottom_box.set_orientation(Gtk.Orientation.HORIZONTAL)
         bottom_box.add(self._items_counter)
@@ -111,7 +141,7 @@ class ItemsView(Gtk.Box):
         self.show_all()
 
     def __len__(self):
-        return len(self._listbox.get_children())
+        return len(self._rows)
 
     def _on_leave_event(self, listbox, event):
         if self._last_entered_item:
@@ -188,6 +218,50 @@ class ItemsView(Gtk.Box):
         item = row.get_child().item
         if item: self.activate_item(item)
 
+    def _on_size_allocate(self, listbox, allocation):
+        metrics = listbox.get_pango_context().get_metrics(None, None)
+        char_width = (
+            metrics.get_approximate_char_width() / Pango.SCALE *
+            ItemsView.MIN_CHAR_WIDTH_RATIO
+        )
+        if char_width <= 0: return
+
+        line_length = int(allocation.width / char_width)
+        if line_length <= HistoryItem.line_length: return
+
+        # labels cut for a narrower list, relabel once the layout is done
+        HistoryItem.line_length = line_length
+        if not self._labels_update_id:
+            self._labels_update_id = GLib.idle_add(self._update_labels)
+
+    def _update_labels(self):
+        self._labels_update_id = 0
+
+        for row in self._rows.values():
+            item_widget = row.get_child()
+            item_widget.set_label(item_widget.item.label)
+
+        return GLib.SOURCE_REMOVE
+
+    def _on_adjustment_changed(self, adjustment):
+        if len(self) >= self.n_shown: return
+
+        # realize the next rows before the bottom comes into view
+        bottom = adjustment.get_value() + adjustment.get_page_size() * 2
+        if bottom >= adjustment.get_upper(): self._realize_more()
+
+    def _realize_more(self):
+        # a budget of rows, not capped by n_shown so items coming into
+        # a short history get rows without waiting for a scroll
+        n_rows = len(self)
+        self._n_realized = (
+            max(n_rows, self._n_realized) + ItemsView.REALIZE_STEP
+        )
+        n_realized = min(self._n_realized, self.n_shown)
+
+        for item in self._bound_history[n_rows:n_realized]:
+            self._add_row(item)
+
     def _on_changed(self, history_items):
         self.show_items()
         self.set_active_item()
@@ -201,34 +275,181 @@ class ItemsView(Gtk.Box):
 
         row = self._get_row_for_item(item)
         if row:
-            row.remove(row.get_child())
-            row.destroy()
+            self._destroy_row(row)
             result = True
 
         return result
 
+    def _on_inserted(self, history_items, item=None):
+        self._place_item(item)
+
+    def _on_moved(self, history_items, item=None):
+        row = self._get_row_for_item(item)
+        if row: self._destroy_row(row)
+
+        self._place_item(item)
+
+    def _on_updated(self, history_items):
+        n_rows = len(self)
+        n_realized = min(self._n_realized, self.n_shown)
+
+        while n_rows > n_realized:
+            n_rows -= 1
+            self._destroy_row(self._listbox.get_row_at_index(n_rows))
+
+        for item in self._bound_history[n_rows:n_realized]:
+            self._add_row(item)
+
+        self._update_load_rest_btn()
+        self.set_active_item()
+        if not self._listbox.get_selected_rows(): self.select_first()
+
+    def _place_item(self, item):
+        """ put the item's row right after the row of its predecessor """
+        # rows past the realized ones come with scrolling
+        if item.index >= min(self._n_realized, self.n_shown): return
+
+        if item.index == 0:
+            position = 0
+        else:
+            previous = self._bound_history.get(item.index - 1)
+            row = self._get_row_for_item(previous) if previous else None
+            if not row: return
+            position = row.get_index() + 1
+
+        self._add_row(item, position)
+
+    def _update_load_rest_btn(self):
+        if self.n_shown < len(self._bound_history):
+            self._load_rest_btn.show()
+        else:
+            self._load_rest_btn.hide()
+
+        self._items_counter.set_n_shown(self.n_shown)
+
+    def _add_row(self, item, position=-1):
+        self._listbox.insert(item.widget, position)
+        row = item.widget.get_parent()
+        row.show()
+
+        self._rows[item.uuid] = row
+        self._rows_by_raw[item.raw] = row
+        self._row_keys[row] = (item.uuid, item.raw)
+        item.connect('changed', self._on_item_changed)
+        self._set_row_active(row, False)
+        self._update_active_row()
+
+    def _on_item_changed(self, item):
+        """ the row is found by the item's contents, keep up with edits """
+        row = item.widget.get_parent()
+        if row not in self._row_keys: return
+
+        uuid, raw = self._row_keys[row]
+        if self._rows.get(uuid) is row: del self._rows[uuid]
+        if self._rows_by_raw.get(raw) is row: del self._rows_by_raw[raw]
+
+        self._rows[item.uuid] = row
+        self._rows_by_raw[item.raw] = row
+        self._row_keys[row] = (item.uuid, item.raw)
+        self._update_active_row()
+
+    def _destroy_row(self, row):
+        uuid, raw = self._row_keys.pop(row, (None, None))
+        if self._rows.get(uuid) is row: del self._rows[uuid]
+        if self._rows_by_raw.get(raw) is row: del self._rows_by_raw[raw]
+        if self._active_row is row: self._active_row = None
+        if self._first_selected_row is row: self._first_selected_row = None
+
+        child = row.get_child()
+        if child:
+            child.item.disconnect('changed', self._on_item_changed)
+            row.remove(child)
+        row.destroy()
+
+    def _set_row_active(self, row, active):
+        item_widget = row.get_child()
+        row.set_activatable(not active)
+        item_widget.set_active(active)
+        if not active: item_widget.set_sensitive(True)
+
+    def _update_active_row(self):
+        row = None
+
+        if self._clipboard_cached and self._clipboard_text is not None:
+            row = self._rows_by_raw.get(self._clipboard_text)
+
+        if row is self._active_row: return
+        if self._active_row: self._set_row_active(self._active_row, False)
+        if row: self._set_row_active(row, True)
+        self._active_row = row
+
+    def _on_owner_change(self, clipboard, event):
+        self._clipboard_serial += 1
+        self._clipboard_cached = False
+        self._clipboard_requested = False
+        self.set_active_item()
+
+    def _on_clipboard_text(self, clipboard, text, serial):
+        if serial != self._clipboard_serial: return
+
+        self._clipboard_text = text
+        self._clipboard_cached = True
+        self._clipboard_requested = False
+        self._update_active_row()
+
+        # select_first() ran before the answer and picked the active row
+        selected_row = self._first_selected_row
+        self._first_selected_row = None
+
+        if (
+            selected_row and
+            selected_row is self._active_row and
+            self._listbox.get_selected_rows() == [selected_row]
+        ):
+            self.select_first(selected_row.has_focus())
+
     def _get_row_for_item(self, item):
-        result = False
+        return self._rows.get(item.uuid)
 
-        for row in self._listbox.get_children():
-            if row.get_child().item == item:
-                result = row
-                break
+    def _get_shortcut_rows(self):
+        """ rows fully scrolled into view, top to bottom, without the
+        active item's, at most N_SHORTCUTS of them """
+        result = []
+        seen_visible = False
+        adjustment = self._listbox.get_adjustment()
+
+        row = self._listbox.get_row_at_y(adjustment.get_value())
+        index = row.get_index() if row else 0
+        row = self._listbox.get_row_at_index(index)
+
+        while row and len(result) < ItemsView.N_SHORTCUTS:
+            visible = utils.is_visible_on_scroll(adjustment, row)
+            if not visible and seen_visible: break
+
+            if visible:
+                seen_visible = True
+                if row.get_child().item.index != 0: result.append(row)
+
+            index += 1
+            row = self._listbox.get_row_at_index(index)
 
         return result
 
-    def save_selection(self):
+    def get_neighbours(self, item):
+        """ items of the rows right above and below the item's row """
+        result = []
+        row = self._get_row_for_item(item)
+        if not row: return result
 
-        def get_current_index(child):
-            result = None
+        for index in (row.get_index() - 1, row.get_index() + 1):
+            if index < 0: continue
 
-            for i, ch in enumerate(self._listbox.get_children()):
-                if ch != child: continue
-                result = i
-                break
+            neighbour = self._listbox.get_row_at_index(index)
+            if neighbour: result.append(neighbour.get_child().item)
 
-            return result
+        return result
 
+    def save_selection(self):
         selected_row = self._listbox.get_selected_rows()
 
         try:
@@ -236,21 +457,20 @@ class ItemsView(Gtk.Box):
         except IndexError:
             return
 
-        self._last_selected_index = get_current_index(selected_row)
+        self._last_selected_index = selected_row.get_index()
 
     def resume_selection(self):
         if not self._last_selected_index: return False
-        children = self._listbox.get_children()
 
-        if len(children) == self._last_selected_index:
+        if len(self) == self._last_selected_index:
             self._last_selected_index -= 1
 
-        for i, row in enumerate(children):
-            if i == self._last_selected_index:
-                self._listbox.select_row(row)
-                # i'm sorry
-                GLib.timeout_add(200, lambda *a, **ka: row.grab_focus())
-                break
+        row = self._listbox.get_row_at_index(self._last_selected_index)
+
+        if row:
+            self._listbox.select_row(row)
+            # i'm sorry
+            GLib.timeout_add(200, lambda *a, **ka: row.grab_focus())
 
         return True
 
@@ -261,69 +481,63 @@ class ItemsView(Gtk.Box):
         self._bound_history = history_items
         self._bound_history.connect('changed', self._on_changed)
         self._bound_history.connect('removed', self._remove)
+        self._bound_history.connect('inserted', self._on_inserted)
+        self._bound_history.connect('moved', self._on_moved)
+        self._bound_history.connect('updated', self._on_updated)
         self._items_counter.set_history_items(self._bound_history)
         self._items_counter.update()
 
         self.show_items()
 
     def show_items(self):
-        limit = common.SETTINGS[common.ITEMS_VIEW_LIMIT]
-        items = self._bound_history
-        if limit: items = items[:limit]
+        """ only the first rows are made, the rest come with scrolling """
+        self._limit = common.SETTINGS[common.ITEMS_VIEW_LIMIT]
         self.clear()
 
-        for item in items:
-            self._listbox.add(item.widget)
-
-        if len(items) < len(self._bound_history): 
-            self._load_rest_btn.show()
-        else:
-            self._load_rest_btn.hide()
-
+        self._n_realized = 0
+        self._realize_more()
+        self._update_load_rest_btn()
         self.show_all()
 
     def load_rest_items(self):
-        limit = common.SETTINGS[common.ITEMS_VIEW_LIMIT]
-        if not limit: return
+        if not self._limit: return
 
-        for item in self._bound_history[limit:]:
-            self._listbox.add(item.widget)
-
-        self._load_rest_btn.hide()
-        self.show_all()
+        self._limit = None
+        self._update_load_rest_btn()
+        self._on_adjustment_changed(self._listbox.get_adjustment())
         return True
 
     def set_active_item(self):
+        """ mark the row holding the clipboard contents, asks the clipboard
+        without waiting if they aren't known since its last owner change """
+        if self._clipboard_cached:
+            self._update_active_row()
+            return
 
-        def on_clipboard(clipboard, text):
-            for row in self._listbox.get_children():
-                item_widget = row.get_child()
-                item = item_widget.item
-
-                if item.raw != text:
-                    row.set_activatable(True)
-                    item_widget.set_sensitive(True)
-                    item_widget.set_active(False)
-                else:
-                    row.set_activatable(False)
-                    item_widget.set_active(True)
-
-        if len(self) < 1: return
+        if len(self) < 1 or self._clipboard_requested: return
 
-        clipboard = Gtk.Clipboard.get_default(Gdk.Display.get_default())
-        text = clipboard.wait_for_text()
-        on_clipboard(clipboard, text)
+        self._clipboard_requested = True
+        self._clipboard.request_text(
+            self._on_clipboard_text,
+            self._clipboard_serial
+        )
 
     def select_first(self, grab_focus=False):
         self._listbox.unselect_all()
         self.set_active_item()
 
-        for row in self._listbox.get_children():
-            if not row.get_activatable() or not row.get_mapped(): continue
+        index = 0
+        row = self._listbox.get_row_at_index(index)
 
-            self._listbox.select_row(row)
-            if grab_focus: row.grab_focus()
-            break
+        while row:
+            if row.get_activatable() and row.get_mapped():
+                self._listbox.select_row(row)
+                if grab_focus: row.grab_focus()
+                if not self._clipboard_cached: self._first_selected_row = row
+                break
+
+            index += 1
+            row = self._listbox.get_row_at_index(index)
 
         self.reset_scroll()
 
@@ -343,10 +557,8 @@ class ItemsView(Gtk.Box):
             GLib.source_remove(self._autoscroll_timeout_id)
             self._autoscroll_timeout_id = 0
 
-        for row in self._listbox.get_children():
-            child = row.get_child()
-            if child: row.remove(child)
-            row.destroy()
+        self._hinted_rows = []
+        for row in list(self._rows.values()): self._destroy_row(row)
 
     def reset_scroll(self):
         adjustment = self._listbox.get_adjustment()
@@ -361,54 +573,18 @@ class ItemsView(Gtk.Box):
         if item: self.emit('item-activated', item)
 
     def get_for_shortcut(self, number):
-        result = None
-        curr_index = None
-        children = self._listbox.get_children()
+        rows = self._get_shortcut_rows()
+        if number >= len(rows): return None
+        return rows[number].get_child().item
 
-        for index, row in enumerate(children):
-            if row.get_child().item.index == 0: continue
-
-            visible = utils.is_visible_on_scroll(
-                self._listbox.get_adjustment(),
-                row
-            )
-            
-            if visible:
-                if curr_index is None:
-                    curr_index = 0
-                else:
-                    curr_index += 1
-
-            if not curr_index is None and curr_index == number:
-                result = row.get_child().item
-                break
+    def show_shortcut_hints(self, show):
+        for row in self._hinted_rows:
+            if row.get_child(): row.get_child().show_shortcut_hint(None)
 
-        return result
+        self._hinted_rows = self._get_shortcut_rows() if show else []
 
-    def show_shortcut_hints(self, show):
-        curr_index = -1
-        children = self._listbox.get_children()
-
-        if show:
-            for index, row in enumerate(children):
-                if curr_index >= 8: break
-                if row.get_child().item.index == 0: continue
-
-                visible = utils.is_visible_on_scroll(
-                    self._listbox.get_adjustment(),
-                    row
-                )
-                
-                if visible:
-                    if curr_index == -1:
-                        curr_index = 0
-                    else:
-                        curr_index += 1
-
-                    row.get_child().show_shortcut_hint(curr_index + 1)
-        else:
-            for row in children:
-                row.get_child().show_shortcut_hint(None)
+        for i, row in enumerate(self._hinted_rows):
+            row.get_child().show_shortcut_hint(i + 1)
 
     @property
     def histories_manager(self):
@@ -418,6 +594,15 @@ class ItemsView(Gtk.Box):
     def listbox(self):
         return self._listbox
 
+    @property
+    def n_shown(self):
+        """ items the list shows, rows for some may not exist yet """
+        if not self._bound_history: return 0
+
+        n_shown = len(self._bound_history)
+        if self._limit: n_shown = min(n_shown, self._limit)
+        return n_shown
+
     @property
     def n_selected(self):
         selected = self.get_selected()